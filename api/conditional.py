@@ -0,0 +1,62 @@
+"""
+Conditional GET of read endpoints. Strong ETag is computed from validators, cheap queries of ids
+and updated_at of the rows a response renders, so a matching If-None-Match is answered with 304
+before anything is serialized.
+Every write of a rendered row must bump its updated_at, set-based updates included.
+Responses carry no Last-Modified, newest updated_at of a page goes back when its newest row is
+deleted or archived, so If-Modified-Since could not tell the page changed.
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+
+def make_etag(request, validators):
+    """
+    Strong ETag of representation: validators, full path (filters, fieldsets, cursor) and accepted media type.
+    """
+    key = repr((request.get_full_path(), getattr(request, 'accepted_media_type', None), validators))
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def conditional_response(request, validators):
+    """
+    Return (etag, 304 response or None) for request, None means the representation has to be rendered.
+    """
+    etag = make_etag(request, validators)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return etag, response
+
+
+def set_validators(response, etag):
+    response['ETag'] = etag
+    # json and msgpack representations have different tags.
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def page_validators(paginator, queryset, request, view, *fields):
+    """
+    Return validators of a page, ids and fields (updated_at by default) of page rows.
+    Keyset paginators read them with the page query, others with one aggregate of the whole queryset.
+    """
+    page_queryset = getattr(paginator, 'page_queryset', None)
+    fields = fields or ('updated_at',)
+    if page_queryset is None:
+        aggregate = queryset.aggregate(rows=Count('pk'), **{f'last_{name}': Max(name) for name in fields})
+        return tuple(sorted(aggregate.items()))
+    return list(page_queryset(queryset, request, view).values_list('pk', *fields))
+
+
+class ConditionalListMixin:
+    """
+    List view mixin answering GET with strong ETag of the requested page, 304 when it matches If-None-Match.
+    """
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, not_modified = conditional_response(request, page_validators(self.paginator, queryset, request, self))
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().list(request, *args, **kwargs), etag)
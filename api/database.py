@@ -0,0 +1,74 @@
+"""
+Database profiles selected by environment, DB_ENGINE=postgresql or sqlite (default).
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# pragmas run on every new SQLite connection: WAL lets readers run while one writer commits,
+# synchronous=NORMAL is durable with WAL and avoids fsync per transaction.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+}
+
+
+def database_settings(environ, base_dir):
+    """
+    Return DATABASES for profile selected by environ
+     - postgresql: persistent connections (DB_CONN_MAX_AGE seconds, default 60) checked before reuse.
+     - sqlite: db.sqlite3 in WAL mode, writers wait DB_BUSY_TIMEOUT seconds (default 20) for the write lock
+       instead of failing with database is locked.
+    DB_REPLICAS (comma separated hosts for postgresql, file paths for sqlite) adds read replica
+    aliases replica1, replica2, ... configured like the primary.
+    """
+    engine = environ.get('DB_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        return with_replicas({
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+                'OPTIONS': {'timeout': float(environ.get('DB_BUSY_TIMEOUT', 20))},
+            }
+        }, 'NAME', environ)
+    if engine != 'postgresql':
+        raise ImproperlyConfigured(f'Unknown DB_ENGINE "{engine}", use postgresql or sqlite.')
+
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('DB_NAME', 'cart'),
+        'USER': environ.get('DB_USER', 'cart'),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    return with_replicas({'default': database}, 'HOST', environ)
+
+
+def with_replicas(databases, key, environ):
+    """
+    Add replica aliases to databases with key (HOST or NAME) taken from DB_REPLICAS.
+    """
+    values = [value.strip() for value in environ.get('DB_REPLICAS', '').split(',') if value.strip()]
+    for index, value in enumerate(values, 1):
+        databases[f'replica{index}'] = {
+            **databases['default'],
+            key: value,
+            # tests read replicas through the primary test database.
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to new SQLite connections.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,158 @@
+"""
+Fast serialization of read endpoints from values_list rows.
+A serializer class is compiled once into a generated row-to-dict function that builds the same
+dicts (same keys, order and values) as the DRF serializer without model instances or per field dispatch.
+"""
+import functools
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .instrumentation import serializer_timing
+from .sparse import SparseFieldset, sparse_queryset
+
+# fields whose DRF representation of a database value is the value itself.
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+# fields converted with their own to_representation.
+CONVERTED_FIELDS = (
+    serializers.DateTimeField,
+    serializers.DateField,
+    serializers.TimeField,
+    serializers.DecimalField,
+    serializers.FloatField,
+    serializers.UUIDField,
+)
+
+
+def iso_datetime(value, tz, convert):
+    """
+    Render aware datetime in current timezone tz like DRF DateTimeField with ISO 8601 format,
+    anything else is left to the field converter.
+    """
+    if tz is None or value.tzinfo is None:
+        return convert(value)
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class CompiledSerializer:
+    """
+    Serializer compiled to values_list paths and a function building output dict from a row of them.
+    """
+    def __init__(self, serializer_class, sparse=None):
+        self.serializer_class = serializer_class
+        self.paths = []
+        namespace = {}
+        expression = self.compile_fields(serializer_class(context={'sparse': sparse}), '', namespace)
+        source = f'def to_dict(row, tz=None):\n    return {expression}\n'
+        exec(compile(source, f'<fast {serializer_class.__name__}>', 'exec'), namespace)
+        self.to_dict = namespace['to_dict']
+
+    def compile_fields(self, serializer, prefix, namespace):
+        items = []
+        for field in serializer._readable_fields:
+            if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+                raise TypeError(f'{serializer.__class__.__name__}.{field.field_name} has no fast path.')
+            path = prefix + field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer):
+                    raise TypeError(f'{serializer.__class__.__name__}.{field.field_name} has no fast path.')
+                # related object is None when its key is.
+                index = self.column(path)
+                value = f'None if row[{index}] is None else {self.compile_fields(field, path + "__", namespace)}'
+            elif isinstance(field, CONVERTED_FIELDS):
+                index = self.column(path)
+                name = f'convert{len(namespace)}'
+                namespace[name] = field.to_representation
+                value = f'None if row[{index}] is None else {name}(row[{index}])'
+                if self.is_iso_datetime(field):
+                    # current timezone is looked up once per many() call instead of once per value.
+                    namespace['iso_datetime'] = iso_datetime
+                    value = f'None if row[{index}] is None else iso_datetime(row[{index}], tz, {name})'
+            elif isinstance(field, IDENTITY_FIELDS):
+                value = f'row[{self.column(path)}]'
+            else:
+                raise TypeError(f'{serializer.__class__.__name__}.{field.field_name} has no fast path.')
+            items.append(f'{field.field_name!r}: {value}')
+        return '{' + ', '.join(items) + '}'
+
+    def is_iso_datetime(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        return (
+            type(field) is serializers.DateTimeField
+            and not hasattr(field, 'timezone')
+            and isinstance(output_format, str)
+            and output_format.lower() == ISO_8601
+        )
+
+    def column(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+        return self.paths.index(path)
+
+    def values(self, queryset, *extra):
+        """
+        Return queryset of named rows with serializer paths followed by extra fields (for example keyset ordering).
+        """
+        return queryset.values_list(*self.paths, *[name for name in extra if name not in self.paths], named=True)
+
+    def many(self, rows):
+        to_dict = self.to_dict
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        with serializer_timing():
+            return [to_dict(row, tz) for row in rows]
+
+
+# sparse fieldsets come from query strings, keep compiled variants bounded.
+@functools.lru_cache(maxsize=256)
+def compile_serializer(serializer_class, sparse=None):
+    return CompiledSerializer(serializer_class, sparse)
+
+
+def ordering_fields(paginator, view):
+    """
+    Field names of paginator ordering, they must be in the rows to build the next cursor.
+    """
+    get_ordering = getattr(paginator, 'get_ordering', None)
+    if get_ordering is None:
+        return ()
+    return tuple(field.lstrip('-') for field in get_ordering(view))
+
+
+class FastListMixin:
+    """
+    List view mixin rendering pages from values_list rows through the compiled serializer,
+    set fast_serialization = False on the view to use the DRF serializer path.
+    Both paths render and read only the sparse fieldset requested with ?fields= and ?expand=.
+    """
+    fast_serialization = True
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse'] = SparseFieldset.from_request(self.request)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        sparse = SparseFieldset.from_request(request)
+        compiled = compile_serializer(self.get_serializer_class(), sparse)
+        queryset = self.filter_queryset(self.get_queryset())
+        if not self.fast_serialization:
+            if sparse is not None:
+                queryset = sparse_queryset(queryset, compiled, *ordering_fields(self.paginator, self))
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+        rows = compiled.values(queryset, *ordering_fields(self.paginator, self))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.many(page))
+        return Response(compiled.many(rows))
@@ -0,0 +1,239 @@
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('api.instrumentation')
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_current = contextvars.ContextVar('api_instrumentation', default=None)
+_placeholders = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def query_shape(sql):
+    """
+    Return sql with literals and IN lists collapsed so queries differing only by values share one shape.
+    """
+    return _placeholders.sub('(...)', _literals.sub('?', sql))
+
+
+class Recorder:
+    """
+    Query and serializer timings of one request.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def repeated_shapes(self, threshold):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class RouteStats:
+    """
+    In process per route latency histograms and query totals.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, duration_ms, queries):
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'queries': 0,
+                    'buckets': [0] * (len(BUCKETS_MS) + 1),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['queries'] += queries
+            index = next((index for index, bound in enumerate(BUCKETS_MS) if duration_ms <= bound), len(BUCKETS_MS))
+            stats['buckets'][index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: dict(stats, buckets=list(stats['buckets'])) for route, stats in self.routes.items()}
+        bounds = [f'le_{bound}' for bound in BUCKETS_MS] + ['inf']
+        return {
+            route: {
+                'count': stats['count'],
+                'mean_ms': round(stats['total_ms'] / stats['count'], 3),
+                'max_ms': round(stats['max_ms'], 3),
+                'mean_queries': round(stats['queries'] / stats['count'], 2),
+                'histogram_ms': dict(zip(bounds, stats['buckets'])),
+            }
+            for route, stats in routes.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+
+route_stats = RouteStats()
+
+
+@contextmanager
+def serializer_timing():
+    """
+    Time block as serializer work of the current request, nested blocks are counted once.
+    Serialization that does not go through BaseSerializer.data (compiled serializers) uses it directly.
+    """
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    recorder.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.serializer_depth -= 1
+        if not recorder.serializer_depth:
+            recorder.serializer_time += time.perf_counter() - start
+
+
+def _install_serializer_timer():
+    """
+    Wrap BaseSerializer.data once so outermost serializer calls are timed for the current request.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, 'instrumented', False):
+        return
+
+    def timed_data(serializer):
+        with serializer_timing():
+            return data.fget(serializer)
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+def wrap_connections(stack, recorder):
+    """
+    Route queries of every database connection of the current thread through recorder until stack closes.
+    """
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+def is_enabled():
+    return getattr(settings, 'API_INSTRUMENTATION', False)
+
+
+class InstrumentationMiddleware:
+    """
+    Opt in (API_INSTRUMENTATION setting) middleware to profile requests.
+     - counts and times SQL queries of every database through execute_wrapper.
+     - flags query shapes repeated API_INSTRUMENTATION_N_PLUS_ONE times or more (N+1 queries).
+     - measures serializer time against view time.
+     - adds Server-Timing header, logs one JSON line per request and feeds per route histograms.
+    When disabled Django drops the middleware at startup so requests do not pay for it.
+    Async capable, under ASGI async views are not pushed to a thread by this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'API_INSTRUMENTATION_N_PLUS_ONE', 5)
+        _install_serializer_timer()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = Recorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, recorder)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder = Recorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # connections are per thread, async ORM queries of the request run in its thread sensitive thread.
+            await sync_to_async(wrap_connections)(stack, recorder)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    def finish(self, request, response, recorder, start):
+        """
+        Add Server-Timing header to response, log request and record its route stats.
+        """
+        total = (time.perf_counter() - start) * 1000
+        db = recorder.db_time * 1000
+        serializer = recorder.serializer_time * 1000
+        view = total - serializer
+        repeated = recorder.repeated_shapes(self.threshold)
+        match = request.resolver_match
+        # router urls are regular expressions, drop their anchors.
+        route = f"{request.method} /{match.route.replace('^', '').replace('$', '')}" if match else f'{request.method} <unresolved>'
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db:.2f};desc="{recorder.queries} queries"',
+            f'serializer;dur={serializer:.2f}',
+            f'view;dur={view:.2f}',
+            f'total;dur={total:.2f}',
+        ])
+        route_stats.record(route, total, recorder.queries)
+        record = {
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 3),
+            'view_ms': round(view, 3),
+            'serializer_ms': round(serializer, 3),
+            'db_ms': round(db, 3),
+            'queries': recorder.queries,
+        }
+        if repeated:
+            record['repeated_queries'] = [{'sql': shape, 'count': count} for shape, count in repeated.items()]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
@@ -0,0 +1,192 @@
+"""
+Read replica routing with read-your-writes pinning.
+Reads go to a replica only inside replica_reads() scopes of read-only views, every other query
+and every read of a client that wrote within REPLICA_PIN_SECONDS goes to the primary (default alias).
+"""
+import contextvars
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'read_primary'
+PIN_HEADER = 'X-Read-Primary'
+
+_state = contextvars.ContextVar('api_routing', default=None)
+
+
+class RoutingState:
+    """
+    Routing state of one request.
+    """
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.used_replica = False
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allow reads inside the block to go to a replica unless the client is pinned to the primary.
+    Yield routing state, its used_replica tells whether any read was served by a replica.
+    """
+    state = _state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _state.set(state)
+    previous = state.replica_reads
+    state.replica_reads = True
+    try:
+        yield state
+    finally:
+        state.replica_reads = previous
+        if token is not None:
+            _state.reset(token)
+
+
+class ReplicaReadsMixin:
+    """
+    View mixin to serve the whole request inside replica_reads().
+    """
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+def replica_lag(alias):
+    """
+    Seconds replica alias is behind its primary, 0 when it replayed everything it received
+    or for databases that do not report lag (SQLite stand-ins).
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+            'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+        )
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads of replica_reads() scopes to DATABASE_REPLICAS
+     - REPLICA_SELECTION round_robin cycles replicas, least_lag picks the replica with the smallest
+       lag (probed at most every REPLICA_LAG_CACHE seconds) and skips replicas behind more than REPLICA_MAX_LAG.
+     - pinned clients and requests that already wrote read from the primary.
+     - all writes go to the primary and are recorded on request state to pin the client.
+    """
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lags = {}
+        self._lock = threading.Lock()
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.pinned or state.wrote:
+            return None
+        alias = self.select_replica()
+        if alias is not None:
+            state.used_replica = True
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # replicas receive schema changes by replication.
+        return db not in replicas()
+
+    def select_replica(self):
+        aliases = replicas()
+        if not aliases:
+            return None
+        if getattr(settings, 'REPLICA_SELECTION', 'round_robin') != 'least_lag':
+            return aliases[next(self._counter) % len(aliases)]
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG', 5)
+        lags = {alias: self.lag(alias) for alias in aliases}
+        fresh = [alias for alias in aliases if lags[alias] <= max_lag]
+        return min(fresh, key=lags.get) if fresh else None
+
+    def lag(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lags.get(alias, (None, None))
+        if checked_at is None or now - checked_at > getattr(settings, 'REPLICA_LAG_CACHE', 1.0):
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError:
+                # unreachable replica is skipped until next probe.
+                lag = math.inf
+            with self._lock:
+                self._lags[alias] = (now, lag)
+        return lag
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware to keep read-your-writes for replica routing
+     - requests with the read_primary cookie or X-Read-Primary header read from the primary.
+     - responses to requests that wrote set the read_primary cookie for REPLICA_PIN_SECONDS.
+    When no replica is configured Django drops the middleware at startup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.request_state(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = self.request_state(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    def request_state(self, request):
+        return RoutingState(pinned=PIN_COOKIE in request.COOKIES or PIN_HEADER in request.headers)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5), httponly=True, samesite='Lax'
+            )
+        return response
@@ -10,7 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
+from api.database import database_settings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,9 +45,13 @@ INSTALLED_APPS = [
     'cart',
     'customer',
     'product',
+    'benchmarks',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.InstrumentationMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +61,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Opt in request profiling (SQL count and time, N+1 shapes, serializer time, Server-Timing header),
+# the middleware removes itself at startup when disabled.
+API_INSTRUMENTATION = os.environ.get('API_INSTRUMENTATION') == '1'
+API_INSTRUMENTATION_N_PLUS_ONE = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 ROOT_URLCONF = 'api.urls'
 
 TEMPLATES = [
@@ -78,13 +101,55 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE=postgresql selects the production profile, see api/database.py for its variables.
+DATABASES = database_settings(os.environ, BASE_DIR)
+
+# Read-only views read from DB_REPLICAS aliases (DB_REPLICA_SELECTION round_robin or least_lag),
+# replicas behind more than REPLICA_MAX_LAG seconds are skipped and clients read from the primary
+# for REPLICA_PIN_SECONDS after they write.
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_SELECTION = os.environ.get('DB_REPLICA_SELECTION', 'round_robin')
+REPLICA_MAX_LAG = 5
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'customer-cart-api',
     }
 }
 
+# Cache alias and timeout (seconds) for serialized cart details payloads.
+CART_DETAIL_CACHE_ALIAS = 'default'
+CART_DETAIL_CACHE_TIMEOUT = 300
+
+# Attempts of optimistic (compare-and-swap on row version) cart writes before answering 409 Conflict.
+CART_VERSION_ATTEMPTS = 3
+
+# Seconds stock stays held for an added cart item, release_expired_holds gives expired holds back.
+CART_RESERVATION_TTL = 15 * 60
+
+# Days after which archive_cart_history moves removed and checked out cart items to the archive,
+# and after which carts without any updated added item are purged as abandoned.
+CART_ARCHIVE_AFTER_DAYS = 90
+CART_ABANDONED_AFTER_DAYS = 30
+
+# Per process product snapshots read by cart validation: max entries and seconds they stay fresh.
+PRODUCT_SNAPSHOT_CACHE_SIZE = 10000
+PRODUCT_SNAPSHOT_CACHE_TTL = 30
+
+# Background jobs: attempts before a job is failed, retry backoff base and cap (seconds, doubled per attempt)
+# and seconds after which a running job whose worker stopped is given back to the queue.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF = 5
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_STALE_AFTER = 10 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -127,9 +192,25 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# MessagePack (Accept: application/msgpack) is offered only when msgpack is installed.
+MSGPACK_ENABLED = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     # YOUR SETTINGS
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *(['api.renderers.MessagePackRenderer'] if MSGPACK_ENABLED else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(['api.renderers.MessagePackParser'] if MSGPACK_ENABLED else []),
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
 }
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Customer-Cart-Api',
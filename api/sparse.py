@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets of list responses, requested with ?fields= and ?expand= query parameters.
+ - fields=id,quantity renders only those fields, dotted names select fields of a relation
+   (fields=id,product.name renders id and product with its name only).
+ - expand=product renders relation nested, relations not expanded render as primary key.
+Without both parameters responses are rendered in full with every relation nested.
+Unknown names are ignored.
+"""
+from collections import namedtuple
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    if value is None:
+        return None
+    # empty parameter is the same as a missing one.
+    return frozenset(name.strip() for name in value.split(',') if name.strip()) or None
+
+
+class SparseFieldset(namedtuple('SparseFieldset', ['fields', 'expand'])):
+    """
+    Requested fields (None renders every field) and expanded relations of a response.
+    Hashable so compiled serializers are cached per fieldset.
+    """
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        fields, expand = parse_names(params.get(FIELDS_PARAM)), parse_names(params.get(EXPAND_PARAM))
+        if fields is None and expand is None:
+            return None
+        return cls(fields, expand or frozenset())
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields or self.is_selected(name)
+
+    def is_expanded(self, name):
+        return name in self.expand or self.is_selected(name) or any(
+            other.startswith(f'{name}.') for other in self.expand
+        )
+
+    def is_selected(self, name):
+        """
+        Return True when fields of relation name are selected with dotted names.
+        """
+        return self.fields is not None and any(other.startswith(f'{name}.') for other in self.fields)
+
+    def nested(self, name):
+        """
+        Fieldset of relation name, all of its fields unless dotted names select some.
+        """
+        prefix = f'{name}.'
+        fields = None
+        if self.is_selected(name):
+            fields = frozenset(other[len(prefix):] for other in self.fields if other.startswith(prefix))
+        expand = frozenset(other[len(prefix):] for other in self.expand if other.startswith(prefix))
+        return SparseFieldset(fields, expand)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin rendering the fieldset given as sparse in context (or by parent serializer when nested).
+    Relations listed in expandable_fields render nested only when expanded.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse = self.sparse_fieldset()
+        if sparse is None:
+            return fields
+        for name in list(fields):
+            if not sparse.includes(name):
+                del fields[name]
+            elif name in self.expandable_fields:
+                if sparse.is_expanded(name):
+                    fields[name].sparse = sparse.nested(name)
+                else:
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, source=fields[name].source)
+        return fields
+
+    def sparse_fieldset(self):
+        if hasattr(self, 'sparse'):
+            return self.sparse
+        parent = self.parent
+        # only the serializer a view renders reads the context, nested ones get their fieldset from parent.
+        if parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return self.context.get('sparse')
+        return None
+
+
+def sparse_queryset(queryset, compiled, *extra):
+    """
+    Limit queryset to columns read by compiled serializer (and extra fields, for example keyset ordering),
+    joining only relations it renders nested.
+    """
+    related = {path.rsplit('__', 1)[0] for path in compiled.paths if '__' in path}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*compiled.paths, *[name for name in extra if name not in compiled.paths])
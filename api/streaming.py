@@ -0,0 +1,94 @@
+import csv
+import datetime
+import decimal
+import json
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.views import View
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    NDJSON: 'application/x-ndjson',
+}
+
+
+def encode_value(value):
+    """
+    Encode value read from database the way serializers render it.
+    """
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class _Line:
+    """
+    File like object for csv writer returning written line instead of storing it.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, fmt=NDJSON, chunk_size=2000, buffer_size=65536):
+    """
+    Yield queryset rows encoded as csv or ndjson in buffers of about buffer_size characters.
+    Rows are read with values_list over QuerySet.iterator so no model instance is built
+    and memory stays flat whatever the number of rows.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    buffer = []
+    size = 0
+    writer = csv.writer(_Line())
+
+    def encode(row):
+        if fmt == CSV:
+            return writer.writerow([encode_value(value) for value in row])
+        return json.dumps({field: encode_value(value) for field, value in zip(fields, row)}, separators=(',', ':')) + '\n'
+
+    if fmt == CSV:
+        buffer.append(writer.writerow(fields))
+    for row in rows:
+        line = encode(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class ExportView(View):
+    """
+    View to stream queryset rows as csv or ndjson (?format=csv|ndjson, default ndjson).
+    """
+    queryset = None
+    fields = ()
+    filename = 'export'
+    chunk_size = 2000
+
+    def get_queryset(self):
+        return self.queryset.order_by('pk')
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', NDJSON)
+        if fmt not in CONTENT_TYPES:
+            return HttpResponseBadRequest(f'Unsupported format, use one of: {", ".join(CONTENT_TYPES)}.')
+        try:
+            queryset = self.get_queryset()
+        except (ValueError, ValidationError) as exc:
+            return HttpResponseBadRequest(str(exc))
+        response = StreamingHttpResponse(
+            export_rows(queryset, self.fields, fmt, self.chunk_size),
+            content_type=CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{fmt}"'
+        return response
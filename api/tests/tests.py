@@ -0,0 +1,200 @@
+import io
+import itertools
+import json
+import unittest
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from api import renderers
+from api.database import database_settings
+from api.instrumentation import InstrumentationMiddleware, Recorder, query_shape, route_stats
+from api.routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, replica_reads
+from cart.models import CartItem
+from customer.models import Customer
+from product.models import Product
+
+class InstrumentationMiddlewareTest(TestCase):
+    """
+    Test Cases for opt in request instrumentation.
+    """
+    def setUp(self):
+        # Create test data
+        cache.clear()
+        route_stats.reset()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.cart_details = reverse('cart-items-details')
+        self.data = {'cart_id': self.customer.cart.id}
+
+    def test_disabled_by_default(self):
+        response = APIClient().post(self.cart_details, self.data)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(route_stats.snapshot(), {})
+
+    @override_settings(API_INSTRUMENTATION=True)
+    def test_server_timing_log_and_route_stats(self):
+        client = APIClient()
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            response = client.post(self.cart_details, self.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'POST /cart/items_details/')
+        self.assertEqual(record['queries'], 2)
+        with self.assertLogs('api.instrumentation', 'INFO'):
+            response = client.get(reverse('instrumentation'))
+        self.assertTrue(response.data['enabled'])
+        self.assertEqual(response.data['routes']['POST /cart/items_details/']['count'], 1)
+
+    @override_settings(API_INSTRUMENTATION=True)
+    def test_compiled_serializer_timed(self):
+        # every perf_counter call advances one second, timed blocks last at least that long.
+        with mock.patch('api.instrumentation.time.perf_counter', side_effect=itertools.count()):
+            with self.assertLogs('api.instrumentation', 'INFO') as logs:
+                APIClient().get(reverse('product_list'))
+        self.assertGreaterEqual(json.loads(logs.records[0].getMessage())['serializer_ms'], 1000)
+
+    @override_settings(API_INSTRUMENTATION=True)
+    async def test_async_requests_stay_async(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(view)))
+        with self.assertLogs('api.instrumentation', 'INFO') as logs:
+            response = await self.async_client.post(reverse('cart-async-items-details'), self.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'POST /cart/async/items_details/')
+        self.assertEqual(record['queries'], 2)
+
+    def test_repeated_query_shapes(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM product WHERE id = 12 AND name = 'a' AND id IN (%s, %s)"),
+            'SELECT * FROM product WHERE id = ? AND name = ? AND id IN (...)',
+        )
+        recorder = Recorder()
+        with connection.execute_wrapper(recorder):
+            for product in Product.objects.all():
+                list(CartItem.objects.filter(product=product))
+                list(CartItem.objects.filter(product=product))
+        self.assertEqual(recorder.queries, 3)
+        self.assertEqual(list(recorder.repeated_shapes(2).values()), [2])
+
+
+class DatabaseSettingsTest(TestCase):
+    """
+    Test Cases for database profiles selected by environment.
+    """
+    def test_sqlite_profile(self):
+        database = database_settings({'DB_BUSY_TIMEOUT': '5'}, Path('/srv'))['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], Path('/srv/db.sqlite3'))
+        self.assertEqual(database['OPTIONS'], {'timeout': 5.0})
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # 1 is NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_postgresql_profile(self):
+        database = database_settings({'DB_ENGINE': 'postgresql', 'DB_HOST': 'db', 'DB_CONN_MAX_AGE': '300'}, Path('/srv'))['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((database['HOST'], database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), ('db', 300, True))
+        with self.assertRaises(ImproperlyConfigured):
+            database_settings({'DB_ENGINE': 'mysql'}, Path('/srv'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTest(TestCase):
+    """
+    Test Cases for read replica routing and read-your-writes pinning.
+    """
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_round_robin_reads_in_replica_scope(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+        with replica_reads() as routing:
+            self.assertEqual([self.router.db_for_read(Product) for _ in range(3)], ['replica1', 'replica2', 'replica1'])
+            self.assertTrue(routing.used_replica)
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            # reads after a write see it on the primary.
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    @override_settings(REPLICA_SELECTION='least_lag', REPLICA_MAX_LAG=2)
+    def test_least_lag_skips_lagging_replicas(self):
+        lags = {'replica1': 1.5, 'replica2': 0.5}
+        with mock.patch('api.routers.replica_lag', side_effect=lambda alias: lags[alias]), replica_reads():
+            self.assertEqual(self.router.db_for_read(Product), 'replica2')
+            lags['replica2'] = 3
+            self.router._lags.clear()
+            self.assertEqual(self.router.db_for_read(Product), 'replica1')
+            lags['replica1'] = 3
+            self.router._lags.clear()
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_writes_pin_client_to_primary(self):
+        reads = []
+
+        def view(request):
+            with replica_reads():
+                reads.append(self.router.db_for_read(Product))
+                if request.method == 'POST':
+                    self.router.db_for_write(Product)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        self.assertNotIn(PIN_COOKIE, middleware(factory.get('/')).cookies)
+        factory.cookies[PIN_COOKIE] = '1'
+        middleware(factory.get('/'))
+        middleware(RequestFactory().get('/', HTTP_X_READ_PRIMARY='1'))
+        self.assertEqual(reads, ['replica1', 'replica2', None, None])
+
+
+class RendererTest(TestCase):
+    """
+    Test Cases for orjson and msgpack renderers and parsers.
+    """
+    def setUp(self):
+        self.payload = {
+            'price': Decimal('10.50'),
+            'at': timezone.now().replace(microsecond=123456),
+            'name': 'line\u2028separator é',
+            1: [None, True, 1.5],
+        }
+
+    def test_orjson_renderer_matches_drf(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+        indented = renderers.FastJSONRenderer().render(self.payload, 'application/json; indent=2')
+        self.assertEqual(indented, JSONRenderer().render(self.payload, 'application/json; indent=2'))
+
+    def test_orjson_parser(self):
+        body = b'{"cart_id": 1, "name": "\xc3\xa9"}'
+        self.assertEqual(renderers.FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        with self.assertRaisesMessage(Exception, 'JSON parse error'):
+            renderers.FastJSONParser().parse(io.BytesIO(b'{'))
+
+    @unittest.skipUnless(renderers.msgpack, 'msgpack is not installed')
+    def test_msgpack_negotiated_by_accept(self):
+        Product.objects.create(name='Prod', price = 10, stock_quantity=5)
+        response = APIClient().get(reverse('product_list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content)['results'][0]['price'], '10.00')
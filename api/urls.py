@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from .views import InstrumentationView
 
 urlpatterns = [
     # YOUR PATTERNS
@@ -29,4 +30,5 @@ urlpatterns = [
     path('customer/', include('customer.urls')),
     path('product/', include('product.urls')),
     path('cart/', include('cart.urls')),
+    path('instrumentation/', InstrumentationView.as_view(), name='instrumentation'),
 ]
@@ -0,0 +1,13 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .instrumentation import is_enabled, route_stats
+
+
+class InstrumentationView(APIView):
+    """
+    View to show per route latency histograms collected by instrumentation middleware in this process.
+    """
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response({'enabled': is_enabled(), 'routes': route_stats.snapshot()})
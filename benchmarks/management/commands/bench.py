@@ -0,0 +1,69 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks import suite
+
+
+class Command(BaseCommand):
+    """
+    Command to measure latency, query count and peak memory of cart, product and customer
+    endpoints on seeded data volumes and compare them with a stored baseline.
+    """
+    help = 'Benchmark API endpoints (p50/p95 latency, queries, peak memory) and fail on regression against a baseline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', choices=list(suite.SCENARIOS), dest='scenarios',
+            help='Predefined data volume, may be repeated (default small).',
+        )
+        parser.add_argument('--products', type=int, help='Run custom volume with this number of products.')
+        parser.add_argument('--customers', type=int, default=50, help='Customers with carts in custom volume.')
+        parser.add_argument('--items-per-cart', type=int, default=10, help='Added items per cart in custom volume.')
+        parser.add_argument('--endpoint', action='append', choices=list(suite.ENDPOINTS), dest='endpoints', help='Endpoint to run, may be repeated (default all).')
+        parser.add_argument('--repeat', type=int, default=20, help='Measured calls per endpoint.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--baseline', help='Compare results with baseline JSON at this path.')
+        parser.add_argument('--save-baseline', help='Write results as new baseline JSON to this path.')
+        parser.add_argument('--tolerance', type=float, help='Allowed latency increase ratio over baseline (default 0.5).')
+
+    def handle(self, *args, **options):
+        volumes = {name: suite.SCENARIOS[name] for name in options['scenarios'] or []}
+        if options['products'] is not None:
+            volumes['custom'] = {
+                'products': options['products'],
+                'customers': options['customers'],
+                'items_per_cart': options['items_per_cart'],
+            }
+        if not volumes:
+            volumes['small'] = suite.SCENARIOS['small']
+        try:
+            results = suite.run(volumes, options['endpoints'], options['repeat'])
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+
+        for name, scenario in results['scenarios'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} on {results['meta']['database']}: {scenario['volume']}"))
+            for endpoint, metrics in scenario['endpoints'].items():
+                self.stdout.write(
+                    f"  {endpoint:<22} p50 {metrics['p50_ms']:>9} ms  p95 {metrics['p95_ms']:>9} ms  "
+                    f"queries {metrics['queries']:>3}  peak {metrics['peak_kb']:>8} KiB"
+                )
+        for path in (options['output'], options['save_baseline']):
+            if path:
+                with open(path, 'w') as output:
+                    json.dump(results, output, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                baseline = json.load(baseline)
+            recorded_on = baseline.get('meta', {}).get('database')
+            if recorded_on and recorded_on != results['meta']['database']:
+                raise CommandError(
+                    f"Baseline was recorded on {recorded_on}, this run used {results['meta']['database']}."
+                )
+            tolerances = {}
+            if options['tolerance'] is not None:
+                tolerances = {'p50_ms': options['tolerance'], 'p95_ms': options['tolerance']}
+            found = suite.regressions(results, baseline, tolerances)
+            if found:
+                raise CommandError('Performance regressions:\n' + '\n'.join(found))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
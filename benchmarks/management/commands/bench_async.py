@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from benchmarks.seed import percentile, seed_cart_items, seed_customers, seed_products
+from cart.models import CartItem
+from customer.models import Customer
+from product.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Command to compare throughput of async (ASGI) and sync (WSGI) cart actions under many simultaneous clients.
+    Seeded rows are committed so every client thread sees them and deleted at the end.
+    """
+    help = 'Compare async (ASGI) against sync (WSGI) cart endpoints under concurrent clients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Simultaneous clients, each one uses its own cart.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests sent by each client.')
+        parser.add_argument('--endpoint', choices=['items_details', 'update_item_quantity', 'add_item'], default='items_details')
+        parser.add_argument('--products', type=int, default=1000, help='Number of seeded products.')
+        parser.add_argument('--items-per-cart', type=int, default=10, help='Added items per cart.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        product_ids = seed_products(options['products'])
+        cart_ids = seed_customers(options['clients'])
+        try:
+            seed_cart_items(cart_ids, product_ids, options['items_per_cart'])
+            items = dict(
+                CartItem.objects.filter(cart_id__in=cart_ids).order_by('cart_id', 'id').values_list('cart_id', 'id')
+            )
+            results = []
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for mode in ('wsgi', 'asgi'):
+                    plans = [
+                        self.plan(mode, options['endpoint'], cart_id, items[cart_id], product_ids, options['requests'])
+                        for cart_id in cart_ids
+                    ]
+                    if mode == 'wsgi':
+                        results.append(self.summarize(mode, *self.run_sync(plans)))
+                    else:
+                        results.append(self.summarize(mode, *asyncio.run(self.run_async(plans))))
+        finally:
+            Customer.objects.filter(cart__pk__in=cart_ids).delete()
+            Product.objects.filter(pk__in=product_ids).delete()
+
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']}: {result['requests']} requests ({result['errors']} errors) in {result['seconds']} s, "
+                f"{result['requests_per_second']} req/s, p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def plan(self, mode, endpoint, cart_id, item_id, product_ids, count):
+        """
+        Return list of (path, data) requests of one client.
+        """
+        name = f'cart-async-{endpoint.replace("_", "-")}' if mode == 'asgi' else f'cart-{endpoint.replace("_", "-")}'
+        path = reverse(name)
+        requests = []
+        for index in range(count):
+            if endpoint == 'items_details':
+                # distinct query string per request so details are built, not read from cache.
+                requests.append((f'{path}?n={index}', {'cart_id': cart_id}))
+            elif endpoint == 'update_item_quantity':
+                requests.append((path, {'cart_item_id': item_id, 'quantity': 1 + index % 2}))
+            else:
+                product_id = product_ids[(cart_id + index) % len(product_ids)]
+                requests.append((path, {'cart': cart_id, 'product': product_id, 'quantity': 1}))
+        return requests
+
+    def run_sync(self, plans):
+        def run_client(requests):
+            client = Client(raise_request_exception=False)
+            durations, errors = [], 0
+            for path, data in requests:
+                start = time.perf_counter()
+                response = client.post(path, data)
+                durations.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code >= 400
+            connections.close_all()
+            return durations, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(len(plans)) as pool:
+            outcomes = list(pool.map(run_client, plans))
+        return outcomes, time.perf_counter() - start
+
+    async def run_async(self, plans):
+        async def run_client(requests):
+            client = AsyncClient(raise_request_exception=False)
+            durations, errors = [], 0
+            for path, data in requests:
+                start = time.perf_counter()
+                response = await client.post(path, data)
+                durations.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code >= 400
+            return durations, errors
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(run_client(requests) for requests in plans))
+        elapsed = time.perf_counter() - start
+        await sync_to_async(connections.close_all)()
+        return outcomes, elapsed
+
+    def summarize(self, mode, outcomes, seconds):
+        durations = [duration for client_durations, _ in outcomes for duration in client_durations]
+        return {
+            'mode': mode,
+            'requests': len(durations),
+            'errors': sum(errors for _, errors in outcomes),
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(len(durations) / seconds, 1),
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p95_ms': round(percentile(durations, 95), 3),
+        }
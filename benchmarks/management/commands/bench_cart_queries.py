@@ -0,0 +1,53 @@
+import json
+import statistics
+from django.core.management.base import BaseCommand
+from benchmarks.seed import rolled_back, seed_cart_items, seed_customers, seed_products, timed
+from cart.models import CartItem
+
+
+class Command(BaseCommand):
+    """
+    Command to show query plans and timings of hot cart item lookups on seeded dataset.
+    """
+    help = 'Explain and time hot CartItem lookups (add item, checkout, details) on a seeded dataset.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Number of seeded products.')
+        parser.add_argument('--carts', type=int, default=10000, help='Number of seeded customers with carts.')
+        parser.add_argument('--items-per-cart', type=int, default=20, help='Added items per cart.')
+        parser.add_argument('--history-per-cart', type=int, default=50, help='Checked out items per cart.')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measured query.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--keep', action='store_true', help='Keep seeded rows instead of rolling back.')
+
+    def handle(self, *args, **options):
+        results = []
+        with rolled_back(options['keep']):
+            product_ids = seed_products(options['products'])
+            cart_ids = seed_customers(options['carts'])
+            seed_cart_items(cart_ids, product_ids[::-1], options['history_per_cart'], status=CartItem.CHECKOUT)
+            seed_cart_items(cart_ids, product_ids, options['items_per_cart'])
+
+            cart_id = cart_ids[len(cart_ids) // 2]
+            product_id = CartItem.objects.filter(cart_id=cart_id, status=CartItem.ADDED).values_list('product_id', flat=True).first()
+            lookups = {
+                'add_item': CartItem.objects.filter(
+                    cart_id=cart_id, product_id=product_id, status__in=[CartItem.ADDED, CartItem.REMOVED]
+                ),
+                'checkout_items': CartItem.objects.filter(cart_id=cart_id, status=CartItem.ADDED).order_by().values_list('id', 'product_id', 'quantity'),
+                'items_details': CartItem.objects.filter(cart_id=cart_id).select_related('product').order_by('-updated_at', '-id')[:100],
+            }
+            for name, queryset in lookups.items():
+                durations = timed(lambda: list(queryset.all()), options['repeat'])
+                results.append({
+                    'query': name,
+                    'median_ms': round(statistics.median(durations), 3),
+                    'plan': queryset.explain(),
+                })
+
+        for result in results:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{result['query']}: {result['median_ms']} ms"))
+            self.stdout.write(result['plan'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,52 @@
+import json
+import statistics
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.pagination import KeysetPagination
+from benchmarks.seed import rolled_back, seed_products, timed
+from product.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Command to compare keyset pagination against offset pagination on seeded product catalog.
+    """
+    help = 'Benchmark keyset against offset pagination of products at increasing page depth.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Number of seeded products.')
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measured page.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--keep', action='store_true', help='Keep seeded rows instead of rolling back.')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        factory = APIRequestFactory()
+        results = []
+        with rolled_back(options['keep']):
+            product_ids = seed_products(options['products'])
+            queryset = Product.objects.all()
+            for depth in (0, 0.1, 0.5, 0.9):
+                offset = int(len(product_ids) * depth)
+                keyset = KeysetPagination()
+                cursor = keyset.encode_cursor([product_ids[offset - 1]]) if offset else ''
+                keyset_request = Request(factory.get('/', {'cursor': cursor, 'page_size': page_size} if cursor else {'page_size': page_size}))
+                offset_request = Request(factory.get('/', {'offset': offset, 'limit': page_size}))
+
+                keyset_ms = timed(lambda: keyset.paginate_queryset(queryset, keyset_request), options['repeat'])
+                offset_ms = timed(lambda: LimitOffsetPagination().paginate_queryset(queryset.order_by('id'), offset_request), options['repeat'])
+                results.append({
+                    'offset': offset,
+                    'keyset_ms': round(statistics.median(keyset_ms), 3),
+                    'offset_ms': round(statistics.median(offset_ms), 3),
+                })
+
+        self.stdout.write(f"{'offset':>10} {'keyset ms':>12} {'offset ms':>12}")
+        for result in results:
+            self.stdout.write(f"{result['offset']:>10} {result['keyset_ms']:>12} {result['offset_ms']:>12}")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,77 @@
+import io
+import json
+import statistics
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api import renderers
+from api.fastpath import compile_serializer
+from benchmarks.seed import rolled_back, seed_cart_items, seed_customers, seed_products, timed
+from cart.models import Cart
+from cart.serializers import CartDetailSerializer, CartItemSerializer
+from cart.services import cart_items_queryset
+from product.models import Product
+from product.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    """
+    Command to compare DRF JSON rendering and parsing against orjson (and msgpack when installed)
+    on large product list and cart details payloads, orjson output must match DRF output byte for byte.
+    """
+    help = 'Benchmark JSON renderers and parsers (DRF, orjson, msgpack) on large product list and cart details payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Products listed and items in the cart.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measured renderer or parser.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson is not installed.')
+        rows = options['rows']
+        results = []
+        with rolled_back():
+            product_ids = seed_products(rows)
+            cart_id = seed_customers(1)[0]
+            seed_cart_items([cart_id], product_ids, rows)
+            products = compile_serializer(ProductListSerializer)
+            items = compile_serializer(CartItemSerializer)
+            payloads = {
+                'product_list': {
+                    'next': None,
+                    'results': products.many(products.values(Product.objects.order_by('id'))),
+                },
+                'items_details': dict(CartDetailSerializer(
+                    Cart.objects.get(pk=cart_id),
+                    context={'items': list(items.values(cart_items_queryset(cart_id))), 'fast': True},
+                ).data),
+            }
+
+        for name, payload in payloads.items():
+            drf = JSONRenderer().render(payload)
+            if renderers.FastJSONRenderer().render(payload) != drf:
+                raise CommandError(f'orjson output of {name} differs from DRF output.')
+            candidates = {
+                'drf_render_ms': lambda: JSONRenderer().render(payload),
+                'orjson_render_ms': lambda: renderers.FastJSONRenderer().render(payload),
+                'drf_parse_ms': lambda: JSONParser().parse(io.BytesIO(drf)),
+                'orjson_parse_ms': lambda: renderers.FastJSONParser().parse(io.BytesIO(drf)),
+            }
+            if renderers.msgpack is not None:
+                packed = renderers.MessagePackRenderer().render(payload)
+                candidates['msgpack_render_ms'] = lambda: renderers.MessagePackRenderer().render(payload)
+                candidates['msgpack_parse_ms'] = lambda: renderers.MessagePackParser().parse(io.BytesIO(packed))
+            result = {'payload': name, 'rows': rows, 'json_bytes': len(drf)}
+            for metric, function in candidates.items():
+                result[metric] = round(statistics.median(timed(function, options['repeat'])), 3)
+            results.append(result)
+
+        for result in results:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{result['payload']}: {result['rows']} rows, {result['json_bytes']} bytes"))
+            for metric, value in result.items():
+                if metric.endswith('_ms'):
+                    self.stdout.write(f'  {metric:<18} {value:>10}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
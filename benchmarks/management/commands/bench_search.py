@@ -0,0 +1,47 @@
+import json
+import statistics
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from api.pagination import KeysetPagination
+from benchmarks.seed import rolled_back, seed_products, timed
+from product.models import Product
+from product.search import CONTAINS, ORDERINGS, PREFIX, search_products
+
+
+class Command(BaseCommand):
+    """
+    Command to time first page of product search queries on seeded product catalog.
+    """
+    help = 'Benchmark product search by name prefix, name substring, price range and stock.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Number of seeded products.')
+        parser.add_argument('--page-size', type=int, default=KeysetPagination.page_size, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measured search.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+        parser.add_argument('--keep', action='store_true', help='Keep seeded rows instead of rolling back.')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        # seeded names are 'Product <index>', prices cycle over 0.99 to 999.99.
+        searches = (
+            ('name_prefix', {'q': 'product 12', 'match': PREFIX}, 'name'),
+            ('name_contains', {'q': 'uct 4242', 'match': CONTAINS}, 'name'),
+            ('name_contains_short', {'q': '42', 'match': CONTAINS}, 'price'),
+            ('price_range_in_stock', {'min_price': Decimal('100'), 'max_price': Decimal('200'), 'in_stock': True}, '-price'),
+        )
+        results = []
+        with rolled_back(options['keep']):
+            seed_products(options['products'])
+            for name, filters, ordering in searches:
+                queryset = search_products(Product.objects.all(), **filters).order_by(*ORDERINGS[ordering])[:page_size + 1]
+                rows = len(list(queryset))
+                search_ms = timed(lambda: list(queryset.all()), options['repeat'])
+                results.append({'search': name, 'ordering': ordering, 'rows': rows, 'ms': round(statistics.median(search_ms), 3)})
+
+        self.stdout.write(f"{'search':<22} {'ordering':>8} {'rows':>6} {'ms':>10}")
+        for result in results:
+            self.stdout.write(f"{result['search']:<22} {result['ordering']:>8} {result['rows']:>6} {result['ms']:>10}")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,68 @@
+import json
+import statistics
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from api.fastpath import compile_serializer
+from benchmarks.seed import rolled_back, seed_cart_items, seed_customers, seed_products, timed
+from cart.models import CartItem
+from cart.serializers import CartItemSerializer
+from customer.models import Customer
+from customer.serializers import CustomerListSerializer
+from product.models import Product
+from product.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    """
+    Command to compare DRF serializers against compiled fast path serializers on seeded rows.
+    Both paths read rows from the database and render JSON, rendered bytes must be identical.
+    """
+    help = 'Benchmark DRF against compiled fast path serialization of product, customer and cart item responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows rendered per response.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measured path.')
+        parser.add_argument('--output', help='Write results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        renderer = JSONRenderer()
+        results = []
+        with rolled_back():
+            product_ids = seed_products(rows)
+            cart_ids = seed_customers(rows)
+            seed_cart_items(cart_ids[:1], product_ids, rows)
+            cases = (
+                ('products', ProductListSerializer, Product.objects.order_by('id')),
+                ('customers', CustomerListSerializer, Customer.objects.order_by('id')),
+                ('cart_items', CartItemSerializer, CartItem.objects.filter(cart_id=cart_ids[0]).select_related('product').order_by('id')),
+            )
+            for name, serializer_class, queryset in cases:
+                compiled = compile_serializer(serializer_class)
+
+                def drf():
+                    return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+                def fast():
+                    return renderer.render(compiled.many(compiled.values(queryset.all())))
+
+                if drf() != fast():
+                    raise CommandError(f'Fast path output of {name} differs from DRF output.')
+                drf_ms = statistics.median(timed(drf, options['repeat']))
+                fast_ms = statistics.median(timed(fast, options['repeat']))
+                results.append({
+                    'serializer': name,
+                    'rows': rows,
+                    'drf_ms': round(drf_ms, 3),
+                    'fast_ms': round(fast_ms, 3),
+                    'speedup': round(drf_ms / fast_ms, 2),
+                })
+
+        self.stdout.write(f"{'serializer':<12} {'rows':>8} {'drf ms':>10} {'fast ms':>10} {'speedup':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['serializer']:<12} {result['rows']:>8} {result['drf_ms']:>10} {result['fast_ms']:>10} {result['speedup']:>8}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from django.db import transaction
+from cart.models import Cart, CartItem
+from customer.models import Customer
+from customer.services import bulk_create_customers
+from product.models import Product
+
+
+@contextmanager
+def rolled_back(keep=False):
+    """
+    Run benchmark inside transaction rolled back at the end unless keep is set,
+    so seeded rows never stay in the database.
+    """
+    with transaction.atomic():
+        yield
+        if not keep:
+            transaction.set_rollback(True)
+
+
+def seed_products(count, batch_size=5000):
+    """
+    Insert count products in batches and return their ids.
+    """
+    products = (
+        Product(name=f'Product {index}', price=Decimal(index % 1000) + Decimal('0.99'), stock_quantity=1000)
+        for index in range(count)
+    )
+    created = []
+    batch = []
+    for product in products:
+        batch.append(product)
+        if len(batch) == batch_size:
+            created.extend(Product.objects.bulk_create(batch))
+            batch = []
+    created.extend(Product.objects.bulk_create(batch))
+    return [product.pk for product in created]
+
+
+def seed_customers(count, batch_size=5000):
+    """
+    Insert count customers with their carts and return cart ids.
+    """
+    carts = []
+    for start in range(0, count, batch_size):
+        customers = bulk_create_customers(
+            [Customer(name=f'Customer {index}') for index in range(start, min(start + batch_size, count))], batch_size
+        )
+        carts.extend(customer.cart.pk for customer in customers)
+    return carts
+
+
+def seed_cart_items(cart_ids, product_ids, items_per_cart, status=CartItem.ADDED, batch_size=5000):
+    """
+    Insert items_per_cart items into each cart cycling over products and refresh cart totals.
+    """
+    batch = []
+    offset = 0
+    for cart_id in cart_ids:
+        for index in range(items_per_cart):
+            product_id = product_ids[(offset + index) % len(product_ids)]
+            batch.append(CartItem(cart_id=cart_id, product_id=product_id, quantity=1, status=status))
+            if len(batch) == batch_size:
+                CartItem.objects.bulk_create(batch)
+                batch = []
+        offset += items_per_cart
+    CartItem.objects.bulk_create(batch)
+    for start in range(0, len(cart_ids), batch_size):
+        Cart.objects.filter(pk__in=cart_ids[start:start + batch_size]).refresh_totals()
+
+
+def timed(function, repeat):
+    """
+    Call function repeat times and return list of durations in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(durations, percent):
+    """
+    Return percentile of durations using nearest rank.
+    """
+    ordered = sorted(durations)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
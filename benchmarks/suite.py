@@ -0,0 +1,164 @@
+import platform
+import time
+import tracemalloc
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from cart.cache import cart_detail_cache
+from cart.models import CartItem
+from .seed import percentile, rolled_back, seed_cart_items, seed_customers, seed_products
+
+SCENARIOS = {
+    'small': {'products': 100, 'customers': 50, 'items_per_cart': 5},
+    'medium': {'products': 1000, 'customers': 100, 'items_per_cart': 50},
+    'large': {'products': 10000, 'customers': 500, 'items_per_cart': 200},
+}
+
+
+class Fixtures:
+    """
+    Seeded rows handed to endpoint calls, carts are consumed by checkout and items by remove.
+    """
+    def __init__(self, volume):
+        self.product_ids = seed_products(volume['products'])
+        self.cart_ids = seed_customers(volume['customers'])
+        seed_cart_items(self.cart_ids, self.product_ids, volume['items_per_cart'])
+        self.cart_id = self.cart_ids[0]
+        self.spare_product_id = self.product_ids[-1]
+        self.item_id = CartItem.objects.filter(cart_id=self.cart_id, status=CartItem.ADDED).values_list('id', flat=True).first()
+        self.removable = list(
+            CartItem.objects.filter(status=CartItem.ADDED).exclude(cart_id=self.cart_id).values_list('id', flat=True)
+        )
+        self.checkout_carts = self.cart_ids[1:]
+
+
+def add_item(client, fixtures, iteration):
+    return client.post(reverse('cart-add-item'), {'cart': fixtures.cart_id, 'product': fixtures.spare_product_id, 'quantity': 1 + iteration % 2})
+
+
+def remove_item(client, fixtures, iteration):
+    return client.post(reverse('cart-remove-item'), {'cart_item_id': fixtures.removable.pop()})
+
+
+def update_item_quantity(client, fixtures, iteration):
+    return client.post(reverse('cart-update-item-quantity'), {'cart_item_id': fixtures.item_id, 'quantity': 1 + iteration % 2})
+
+
+def checkout_items(client, fixtures, iteration):
+    return client.post(reverse('cart-checkout-items'), {'cart_id': fixtures.checkout_carts.pop()})
+
+
+def items_details(client, fixtures, iteration):
+    # measure building the payload, not a cache hit.
+    cart_detail_cache.cache.clear()
+    return client.post(reverse('cart-items-details'), {'cart_id': fixtures.cart_id})
+
+
+def product_list(client, fixtures, iteration):
+    return client.get(reverse('product_list'))
+
+
+def customer_list(client, fixtures, iteration):
+    return client.get(reverse('customer_list'))
+
+
+ENDPOINTS = {
+    'add_item': add_item,
+    'remove_item': remove_item,
+    'update_item_quantity': update_item_quantity,
+    'checkout_items': checkout_items,
+    'items_details': items_details,
+    'product_list': product_list,
+    'customer_list': customer_list,
+}
+
+
+def measure(call, repeat):
+    """
+    Call endpoint repeat times recording latency and query count, then once more under tracemalloc for peak memory.
+    """
+    durations = []
+    queries = []
+    for iteration in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = call(iteration)
+            durations.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'Endpoint returned {response.status_code}: {getattr(response, "data", "")}')
+        queries.append(len(captured))
+    tracemalloc.start()
+    try:
+        call(repeat)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p95_ms': round(percentile(durations, 95), 3),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def check_volume(name, volume, repeat):
+    """
+    Raise ValueError if volume is too small, checkout and remove use one fresh cart or item per call.
+    """
+    if not 0 < volume['items_per_cart'] <= volume['products']:
+        raise ValueError(f'Scenario {name} needs between 1 and products items per cart.')
+    if volume['customers'] < repeat + 2:
+        raise ValueError(f'Scenario {name} needs at least {repeat + 2} customers for {repeat} calls.')
+
+
+def run(volumes, endpoints=None, repeat=20):
+    """
+    Seed each volume inside a rolled back transaction and measure endpoints against it.
+    """
+    endpoints = endpoints or list(ENDPOINTS)
+    results = {
+        'meta': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'repeat': repeat,
+        },
+        'scenarios': {},
+    }
+    client = APIClient()
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, volume in volumes.items():
+            scenario = {'volume': volume, 'endpoints': {}}
+            check_volume(name, volume, repeat)
+            with rolled_back():
+                fixtures = Fixtures(volume)
+                for endpoint in endpoints:
+                    scenario['endpoints'][endpoint] = measure(
+                        lambda iteration: ENDPOINTS[endpoint](client, fixtures, iteration), repeat
+                    )
+            results['scenarios'][name] = scenario
+    return results
+
+
+TOLERANCES = {'p50_ms': 0.5, 'p95_ms': 0.5, 'queries': 0.0, 'peak_kb': 0.25}
+
+
+def regressions(results, baseline, tolerances=None):
+    """
+    Return list of messages for metrics above baseline by more than their tolerance ratio.
+    """
+    tolerances = {**TOLERANCES, **(tolerances or {})}
+    found = []
+    for name, scenario in results['scenarios'].items():
+        base_scenario = baseline.get('scenarios', {}).get(name)
+        if base_scenario is None:
+            continue
+        for endpoint, metrics in scenario['endpoints'].items():
+            base_metrics = base_scenario['endpoints'].get(endpoint)
+            if base_metrics is None:
+                continue
+            for metric, tolerance in tolerances.items():
+                if metric in base_metrics and metrics[metric] > base_metrics[metric] * (1 + tolerance):
+                    found.append(f'{name}.{endpoint}.{metric}: {metrics[metric]} > baseline {base_metrics[metric]}')
+    return found
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from benchmarks import suite
+from product.models import Product
+
+class BenchCommandTest(TestCase):
+    """
+    Test Cases for endpoint benchmark suite and baseline regression check.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        if os.path.exists(self.baseline):
+            os.remove(self.baseline)
+        os.rmdir(self.directory)
+
+    def bench(self, *args):
+        call_command(
+            'bench', '--products', '20', '--customers', '6', '--items-per-cart', '2', '--repeat', '3', *args,
+            stdout=StringIO(),
+        )
+
+    def test_bench_saves_metrics_and_rolls_back_seed(self):
+        self.bench('--save-baseline', self.baseline)
+        with open(self.baseline) as baseline:
+            results = json.load(baseline)
+        endpoints = results['scenarios']['custom']['endpoints']
+        self.assertEqual(set(endpoints), set(suite.ENDPOINTS))
+        self.assertEqual(set(endpoints['items_details']), {'p50_ms', 'p95_ms', 'queries', 'peak_kb'})
+        # page validators (ids and updated_at) and page rows.
+        self.assertEqual(endpoints['product_list']['queries'], 2)
+        self.assertFalse(Product.objects.exists())
+
+    def test_bench_fails_on_regression(self):
+        self.bench('--save-baseline', self.baseline)
+        with open(self.baseline) as baseline:
+            results = json.load(baseline)
+        results['scenarios']['custom']['endpoints']['product_list']['queries'] = 0
+        with open(self.baseline, 'w') as baseline:
+            json.dump(results, baseline)
+        with self.assertRaisesMessage(CommandError, 'custom.product_list.queries'):
+            self.bench('--baseline', self.baseline, '--endpoint', 'product_list')
+
+    def test_bench_rejects_baseline_of_other_database(self):
+        with open(self.baseline, 'w') as baseline:
+            json.dump({'meta': {'database': 'postgresql'}, 'scenarios': {}}, baseline)
+        with self.assertRaisesMessage(CommandError, 'Baseline was recorded on postgresql, this run used sqlite.'):
+            self.bench('--baseline', self.baseline, '--endpoint', 'product_list')
+
+    def test_bench_serializers_output_matches(self):
+        output = StringIO()
+        call_command('bench_serializers', '--rows', '20', '--repeat', '1', stdout=output)
+        self.assertEqual([line.split()[0] for line in output.getvalue().splitlines()[1:]], ['products', 'customers', 'cart_items'])
+        self.assertFalse(Product.objects.exists())
+
+    def test_bench_search_rolls_back_seed(self):
+        output = StringIO()
+        call_command('bench_search', '--products', '50', '--repeat', '1', stdout=output)
+        self.assertEqual(
+            [line.split()[0] for line in output.getvalue().splitlines()[1:]],
+            ['name_prefix', 'name_contains', 'name_contains_short', 'price_range_in_stock'],
+        )
+        self.assertFalse(Product.objects.exists())
+
+    def test_bench_rejects_too_small_volume(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', '--products', '5', '--customers', '2', '--repeat', '5', stdout=StringIO())
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, CartBatch, StockReservation, ArchivedCartItem
 
 admin.site.register(Cart)
-admin.site.register(CartItem)
\ No newline at end of file
+admin.site.register(CartItem)
+admin.site.register(CartBatch)
+admin.site.register(StockReservation)
+admin.site.register(ArchivedCartItem)
@@ -0,0 +1,282 @@
+"""
+Async variants of CartViewSet actions for ASGI servers, same request and response contracts.
+Reads and row writes use Django async ORM, serializers only validate and render
+so no query runs outside the async ORM. Checkout stays a sync transaction run through
+sync_to_async because Django 4.2 has no async transactions.
+Responses are rendered with the renderer negotiated from Accept among DEFAULT_RENDERER_CLASSES,
+except the browsable API which needs a DRF view.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from api.pagination import KeysetPagination
+from api.routers import replica_reads
+from api.sparse import SparseFieldset
+from product.cache import product_snapshots
+from product.models import Product
+from .cache import cart_detail_cache
+from .models import Cart, CartItem, InsufficientStock, VersionConflict
+from .serializers import (
+    CartItemSerializer,
+    CartItemAddSerializer,
+    CartItemAddInputSerializer,
+    CartItemRemoveSerializer,
+    CartItemUpdateQuantitySerializer,
+    CartDetailSerializer,
+    CartDetailFilterSerializer,
+)
+from .services import cart_items_queryset, checkout_cart, version_attempts, EmptyCart
+from .views import CartViewSet, cart_key, details_variant, fast_items, matches_version
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """
+    Return response of data, rendered by async_api_view once its renderer is negotiated.
+    """
+    return Response(data, status=status_code)
+
+
+def get_renderers():
+    return [
+        renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if not issubclass(renderer, BrowsableAPIRenderer)
+    ]
+
+
+def finalize_response(request, response):
+    """
+    Render response with renderer selected by Accept header like APIView, 406 when none is acceptable.
+    """
+    renderers = get_renderers()
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(request, renderers)
+    except NotAcceptable as exc:
+        renderer, media_type = renderers[0], renderers[0].media_type
+        response = render({'detail': exc.detail}, exc.status_code)
+    response.accepted_renderer = renderer
+    response.accepted_media_type = media_type
+    response.renderer_context = {'request': request, 'response': response}
+    return response.render()
+
+
+def async_api_view(view):
+    """
+    Wrap async view to accept POST only, parse body with DEFAULT_PARSER_CLASSES and negotiate
+    renderer of response like DRF views.
+    """
+    @functools.wraps(view)
+    async def wrapper(request):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+        if request.method != 'POST':
+            response = render({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+            return finalize_response(request, response)
+        try:
+            data = request.data
+        except APIException as exc:
+            return finalize_response(request, render({'detail': exc.detail}, exc.status_code))
+        return finalize_response(request, await view(request, data))
+
+    # django 4.2 csrf_exempt returns a sync wrapper, mark the coroutine directly.
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+async def validate_add_item(data):
+    """
+    Validate add item data like CartItemAddSerializer, return (validated data, product, errors).
+    """
+    serializer = CartItemAddInputSerializer(data=data)
+    serializer.is_valid()
+    errors = dict(serializer.errors)
+    product = None
+    for name, model in (('cart', Cart), ('product', Product)):
+        if name in errors:
+            continue
+        pk = serializer.fields[name].run_validation(data.get(name))
+        if model is Product:
+            # product is validated from its snapshot, holding stock checks it against the row.
+            snapshot = await product_snapshots.aget(pk)
+            if snapshot is None:
+                errors[name] = [f'Invalid pk "{data.get(name)}" - object does not exist.']
+            else:
+                product = snapshot.as_product()
+            continue
+        if not await model.objects.filter(pk=pk).aexists():
+            errors[name] = [f'Invalid pk "{data.get(name)}" - object does not exist.']
+    if errors:
+        return None, None, {name: errors[name] for name in serializer.fields if name in errors}
+    if product.stock_quantity < serializer.validated_data['quantity']:
+        # snapshot may be stale, reject only against the current row.
+        product_snapshots.invalidate([product.pk])
+        await product.arefresh_from_db()
+        if product.stock_quantity < serializer.validated_data['quantity']:
+            return None, None, {'non_field_errors': ['Insufficient stock quantity.']}
+    return serializer.validated_data, product, None
+
+
+def conflict(data):
+    return render(data, status.HTTP_409_CONFLICT)
+
+
+async def version_conflict(cart_item_id):
+    cart_item = await CartItem.objects.select_related('product').filter(id=cart_item_id).afirst()
+    return conflict({
+        'error': 'Cart item was changed by another request.',
+        'cart_item': CartItemSerializer(cart_item).data if cart_item else None,
+    })
+
+
+@async_api_view
+async def add_item(request, data):
+    validated_data, product, errors = await validate_add_item(data)
+    if errors:
+        return render(errors, status.HTTP_400_BAD_REQUEST)
+    live_items = CartItem.objects.filter(
+        cart_id=validated_data['cart'], product=product, status__in = [CartItem.ADDED, CartItem.REMOVED]
+    )
+    for attempt in range(version_attempts()):
+        if attempt:
+            # product may have changed, check stock again against the current row.
+            product_snapshots.invalidate([product.pk])
+            await product.arefresh_from_db()
+            if product.stock_quantity < validated_data['quantity']:
+                return render({'non_field_errors': ['Insufficient stock quantity.']}, status.HTTP_400_BAD_REQUEST)
+        cart_item = await live_items.afirst()
+        if cart_item is None:
+            extra = {'status': validated_data['status']} if 'status' in validated_data else {}
+            try:
+                cart_item = await CartItem.objects.acreate(
+                    cart_id=validated_data['cart'], product=product, quantity=validated_data['quantity'], **extra
+                )
+            except IntegrityError:
+                # concurrent add inserted live item first (unique_live_cart_item), override it instead.
+                continue
+            except InsufficientStock:
+                return render({'non_field_errors': ['Insufficient stock quantity.']}, status.HTTP_400_BAD_REQUEST)
+            return render(CartItemAddSerializer(cart_item).data, status.HTTP_201_CREATED)
+        if cart_item.status == CartItem.REMOVED:
+            cart_item.status = CartItem.ADDED
+        cart_item.product = product
+        cart_item.quantity = validated_data['quantity']
+        try:
+            await cart_item.asave()
+        except VersionConflict:
+            continue
+        except InsufficientStock:
+            return render({'non_field_errors': ['Insufficient stock quantity.']}, status.HTTP_400_BAD_REQUEST)
+        return render(CartItemAddSerializer(cart_item).data, status.HTTP_201_CREATED)
+    return conflict({'error': 'Cart was changed by another request.'})
+
+
+@async_api_view
+async def remove_item(request, data):
+    cart_item_id = data.get('cart_item_id', None)
+    for attempt in range(version_attempts()):
+        try:
+            cart_item = await CartItem.objects.select_related('product').aget(id=cart_item_id)
+        except (CartItem.DoesNotExist, ValueError):
+            return render({"error": "Invalid cart item."}, status.HTTP_404_NOT_FOUND)
+        if not matches_version(cart_item, data):
+            break
+        serializer = CartItemRemoveSerializer(cart_item, data=data, partial=True)
+        if not serializer.is_valid():
+            return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        if cart_item.status == CartItem.REMOVED:
+            return render({"status": ["Cart item Already Removed Before."]}, status.HTTP_400_BAD_REQUEST)
+        cart_item.status = CartItem.REMOVED
+        try:
+            await cart_item.asave()
+        except VersionConflict:
+            if 'version' in data:
+                break
+            continue
+        return render("Remove Successfully")
+    return await version_conflict(cart_item_id)
+
+
+@async_api_view
+async def update_item_quantity(request, data):
+    cart_item_id = data.get('cart_item_id', None)
+    for attempt in range(version_attempts()):
+        try:
+            cart_item = await CartItem.objects.select_related('product').aget(id=cart_item_id, status=CartItem.ADDED)
+        except (CartItem.DoesNotExist, ValueError):
+            return render({"error": "Invalid cart item."}, status.HTTP_404_NOT_FOUND)
+        if not matches_version(cart_item, data):
+            break
+        if 'quantity' not in data:
+            return render({"quantity": ["This field is required."]}, status.HTTP_400_BAD_REQUEST)
+        serializer = CartItemUpdateQuantitySerializer(cart_item, data=data, partial=True)
+        if not serializer.is_valid():
+            return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        cart_item.quantity = serializer.validated_data['quantity']
+        try:
+            await cart_item.asave()
+        except VersionConflict:
+            if 'version' in data:
+                break
+            continue
+        except InsufficientStock:
+            return render({'non_field_errors': ['Insufficient stock quantity.']}, status.HTTP_400_BAD_REQUEST)
+        return render(CartItemSerializer(cart_item).data)
+    return await version_conflict(cart_item_id)
+
+
+@async_api_view
+async def checkout_items(request, data):
+    cart_id = cart_key(data.get('cart_id', None))
+    if cart_id is None:
+        return render({"error": "Empty cart."}, status.HTTP_404_NOT_FOUND)
+    try:
+        await sync_to_async(checkout_cart)(cart_id)
+    except EmptyCart:
+        return render({'error': 'Cart is empty.'}, status.HTTP_400_BAD_REQUEST)
+    except InsufficientStock as exc:
+        return render({'error': 'Insufficient stock quantity.', 'products': exc.failures}, status.HTTP_400_BAD_REQUEST)
+    except VersionConflict:
+        return conflict({'error': 'Cart was changed by another request.'})
+    return render({'message': 'Cart checked out.'})
+
+
+@async_api_view
+async def items_details(request, data):
+    cart_id = cart_key(data.get('cart_id', None))
+    filters = CartDetailFilterSerializer(data=data)
+    if not filters.is_valid():
+        return render(filters.errors, status.HTTP_400_BAD_REQUEST)
+    if cart_id is None:
+        return render({"error": "Empty cart."}, status.HTTP_404_NOT_FOUND)
+    statuses = filters.validated_data.get('status')
+    sparse = SparseFieldset.from_request(request)
+    paginator = KeysetPagination()
+
+    async def build():
+        try:
+            cart = await Cart.objects.aget(pk=cart_id)
+        except Cart.DoesNotExist:
+            return None
+        items = await paginator.apaginate_queryset(
+            fast_items(cart_items_queryset(cart.pk, statuses), paginator, CartViewSet, sparse), request, view=CartViewSet
+        )
+        context = {'items': items, 'fast': CartViewSet.fast_serialization, 'sparse': sparse}
+        data = dict(CartDetailSerializer(cart, context=context).data)
+        data['next'] = paginator.get_next_link()
+        return data
+
+    try:
+        with replica_reads() as routing:
+            data = await cart_detail_cache.aget_or_build(
+                cart_id, details_variant(request, statuses), build, cacheable=lambda: not routing.used_replica
+            )
+    except APIException as exc:
+        return render({'detail': exc.detail}, exc.status_code)
+    if data is None:
+        return render({"error": "Empty cart."}, status.HTTP_404_NOT_FOUND)
+    return render(data)
@@ -0,0 +1,107 @@
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class CartDetailCache:
+    """
+    Read-through cache for serialized cart details payloads on top of Django cache framework.
+     - payload keys embed a per cart version token, invalidation drops the token
+       so all payload variants of the cart become unreachable at once.
+     - hit and miss counters are kept per process.
+    """
+    def __init__(self, alias=None, timeout=None):
+        self._alias = alias
+        self._timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self._alias or getattr(settings, 'CART_DETAIL_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'CART_DETAIL_CACHE_TIMEOUT', 300)
+
+    def version_key(self, cart_id):
+        return f'cart:{cart_id}:version'
+
+    def get_version(self, cart_id):
+        key = self.version_key(cart_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, uuid.uuid4().hex, None)
+            version = self.cache.get(key)
+        return version
+
+    def get_or_build(self, cart_id, variant, build, cacheable=None):
+        """
+        Return cached payload for cart variant or build and store it, None payloads are not stored
+        and neither are payloads for which cacheable() returns False.
+        """
+        key = self.payload_key(cart_id, variant)
+        payload = self.lookup(key)
+        if payload is None:
+            payload = build()
+            if payload is not None and (cacheable is None or cacheable()):
+                self.cache.set(key, payload, self.timeout)
+        return payload
+
+    async def aget_or_build(self, cart_id, variant, build, cacheable=None):
+        """
+        Same as get_or_build for async views, build is a coroutine function.
+        """
+        key = self.payload_key(cart_id, variant)
+        payload = self.lookup(key)
+        if payload is None:
+            payload = await build()
+            if payload is not None and (cacheable is None or cacheable()):
+                self.cache.set(key, payload, self.timeout)
+        return payload
+
+    def payload_key(self, cart_id, variant):
+        return f'cart:{cart_id}:details:{self.get_version(cart_id)}:{variant}'
+
+    def lookup(self, key):
+        payload = self.cache.get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def invalidate(self, cart_ids):
+        """
+        Drop version tokens of carts now and again after current transaction commits
+        so readers can not cache state that is about to change.
+        """
+        keys = [self.version_key(cart_id) for cart_id in cart_ids]
+        if not keys:
+            return
+        self.cache.delete_many(keys)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.cache.delete_many(keys))
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+cart_detail_cache = CartDetailCache()
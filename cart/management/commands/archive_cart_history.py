@@ -0,0 +1,39 @@
+import datetime
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from cart.services import archive_cart_items, purge_abandoned_carts
+
+
+class Command(BaseCommand):
+    """
+    Command to move old removed and checked out cart items to the archive table and purge abandoned carts.
+    """
+    help = 'Archive old removed and checked out cart items and purge abandoned carts in batches, once or every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of items moved per transaction.')
+        parser.add_argument(
+            '--older-than', type=float, default=getattr(settings, 'CART_ARCHIVE_AFTER_DAYS', 90),
+            help='Archive removed and checked out items not updated for this many days.',
+        )
+        parser.add_argument(
+            '--abandoned-after', type=float, default=getattr(settings, 'CART_ABANDONED_AFTER_DAYS', 30),
+            help='Purge added items of carts not updated for this many days.',
+        )
+        parser.add_argument('--interval', type=float, help='Keep archiving every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            now = timezone.now()
+            archived = archive_cart_items(
+                options['batch_size'], before=now - datetime.timedelta(days=options['older_than'])
+            )
+            purged = purge_abandoned_carts(
+                options['batch_size'], before=now - datetime.timedelta(days=options['abandoned_after'])
+            )
+            self.stdout.write(self.style.SUCCESS(f'Archived {archived} cart items, purged {purged} items of abandoned carts.'))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from api.streaming import CONTENT_TYPES, NDJSON, export_rows
+from cart.views import CartItemExportView, cart_items_history
+from customer.views import CustomerExportView
+from product.views import ProductExportView
+
+EXPORTS = {
+    'products': ProductExportView,
+    'customers': CustomerExportView,
+    'cart_items': CartItemExportView,
+}
+
+
+class Command(BaseCommand):
+    """
+    Command to stream products, customers or cart items history to file or stdout as csv or ndjson.
+    """
+    help = 'Export products, customers or cart items history as csv or ndjson with flat memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(CONTENT_TYPES), default=NDJSON)
+        parser.add_argument('--output', help='File path, stdout when omitted.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip.')
+        parser.add_argument('--cart-id', help='Only export items of this cart (cart_items).')
+        parser.add_argument('--status', help='Only export items with this status (cart_items).')
+
+    def handle(self, *args, **options):
+        view = EXPORTS[options['dataset']]
+        if view is CartItemExportView:
+            queryset = cart_items_history(options['cart_id'], options['status'])
+        else:
+            queryset = view.queryset.order_by('pk')
+        chunks = export_rows(queryset, view.fields, options['format'], options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from cart.services import release_expired_holds
+
+
+class Command(BaseCommand):
+    """
+    Command to give stock held by expired cart reservations back to available stock.
+    """
+    help = 'Release expired stock holds in batches, once or every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of holds released per transaction.')
+        parser.add_argument('--interval', type=float, help='Keep sweeping every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock holds.'))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
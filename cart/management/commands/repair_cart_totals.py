@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    """
+    Command to check stored cart totals against added cart items rows and repair any drift.
+    """
+    help = 'Check denormalized cart totals against cart items and repair drifted carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drifted carts, fail if any found.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of carts repaired per update.')
+
+    def handle(self, *args, **options):
+        drifted = list(Cart.objects.drifted().order_by('pk').values_list('pk', flat=True))
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('No drifted cart totals.'))
+            return
+        if options['check']:
+            raise CommandError(f'{len(drifted)} carts with drifted totals: {drifted[:20]}')
+
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted), batch_size):
+            Cart.objects.filter(pk__in=drifted[start:start + batch_size]).refresh_totals()
+        self.stdout.write(self.style.SUCCESS(f'Repaired totals of {len(drifted)} carts.'))
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0001_initial'),
+        ('product', '0001_initial'),
+        ('cart', '0007_alter_cartitem_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cart',
+            options={'ordering': ['-id'], 'verbose_name': 'Cart', 'verbose_name_plural': 'Carts'},
+        ),
+        migrations.AlterModelOptions(
+            name='cartitem',
+            options={'ordering': ['-updated_at'], 'verbose_name': 'Cart Item', 'verbose_name_plural': 'Cart Items'},
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='customer',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='customer.customer', verbose_name='Customer'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='cart',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cart.cart', verbose_name='Cart'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created at'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='product.product', verbose_name='Product'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='quantity',
+            field=models.PositiveIntegerField(verbose_name='Quantity'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='status',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Item Added'), (1, 'Item Removed'), (2, 'Item Checkout')], default=0, null=True, verbose_name='status'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated at'),
+        ),
+        migrations.CreateModel(
+            name='CartBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, verbose_name='Idempotency key')),
+                ('results', models.JSONField(verbose_name='Results')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created at')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cart.cart', verbose_name='Cart')),
+            ],
+            options={
+                'verbose_name': 'Cart Batch',
+                'verbose_name_plural': 'Cart Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartbatch',
+            constraint=models.UniqueConstraint(fields=('cart', 'idempotency_key'), name='unique_cart_batch_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:10
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def fill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    # added cart items status is 0
+    items = CartItem.objects.filter(cart=OuterRef('pk'), status=0).order_by().values('cart')
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(items.annotate(value=Count('pk')).values('value')), 0),
+        total_quantity=Coalesce(Subquery(items.annotate(value=Sum('quantity')).values('value')), 0),
+        total_price=Round(
+            Coalesce(
+                Subquery(items.annotate(value=Sum(F('product__price') * F('quantity'))).values('value')),
+                Value(Decimal('0')),
+            ),
+            2,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0008_cartbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Item count'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total price'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_quantity',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total quantity'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
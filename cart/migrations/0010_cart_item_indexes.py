@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:14
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+import django.db.models.deletion
+
+
+def remove_duplicate_live_items(apps, schema_editor):
+    """
+    Keep most recently updated live (added or removed) item per cart and product
+    so unique_live_cart_item can be created, then refresh totals of touched carts.
+    """
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    live = CartItem.objects.filter(status__in=[0, 1])
+    duplicates = live.values('cart', 'product').annotate(rows=Count('pk')).filter(rows__gt=1)
+    cart_ids = set()
+    for duplicate in duplicates.iterator():
+        items = live.filter(cart=duplicate['cart'], product=duplicate['product']).order_by('-updated_at', '-pk')
+        CartItem.objects.filter(pk__in=list(items.values_list('pk', flat=True)[1:])).delete()
+        cart_ids.add(duplicate['cart'])
+    if not cart_ids:
+        return
+    items = CartItem.objects.filter(cart=OuterRef('pk'), status=0).order_by().values('cart')
+    Cart.objects.filter(pk__in=cart_ids).update(
+        item_count=Coalesce(Subquery(items.annotate(value=Count('pk')).values('value')), 0),
+        total_quantity=Coalesce(Subquery(items.annotate(value=Sum('quantity')).values('value')), 0),
+        total_price=Round(
+            Coalesce(
+                Subquery(items.annotate(value=Sum(F('product__price') * F('quantity'))).values('value')),
+                Value(Decimal('0')),
+            ),
+            2,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0009_cart_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'status'], name='cart_item_cart_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'product'], name='cart_item_cart_product_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='cart',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='cart.cart', verbose_name='Cart'),
+        ),
+        migrations.RunPython(remove_duplicate_live_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', [0, 1])), fields=('cart', 'product'), name='unique_live_cart_item'),
+        ),
+    ]
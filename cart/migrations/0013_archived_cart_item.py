@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0012_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCartItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Cart item')),
+                ('product_id', models.PositiveIntegerField(verbose_name='Product')),
+                ('product_name', models.CharField(max_length=100, verbose_name='Product name')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Price')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'Item Added'), (1, 'Item Removed'), (2, 'Item Checkout')], verbose_name='status')),
+                ('created_at', models.DateTimeField(verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(verbose_name='Updated at')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived at')),
+                ('cart', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='cart.cart', verbose_name='Cart')),
+            ],
+            options={
+                'verbose_name': 'Archived Cart Item',
+                'verbose_name_plural': 'Archived Cart Items',
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['cart', 'updated_at', 'id'], name='archived_item_cart_updated_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0013_archived_cart_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartbatch',
+            name='payload_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Payload hash'),
+        ),
+    ]
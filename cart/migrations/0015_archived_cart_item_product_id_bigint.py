@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0014_cart_batch_payload_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedcartitem',
+            name='product_id',
+            field=models.PositiveBigIntegerField(verbose_name='Product'),
+        ),
+    ]
@@ -1,12 +1,101 @@
-from django.db import models
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from product.models import Product
+from product.signals import products_bulk_updated
+from .cache import cart_detail_cache
+
+class CartQuerySet(models.QuerySet):
+    """
+    Cart QuerySet to maintain denormalized totals of added cart items.
+    """
+    def add_totals(self, item_count=0, quantity=0, price=0):
+        """
+        Apply totals delta with atomic F() expressions.
+        """
+        return self.update(
+            item_count=F('item_count') + item_count,
+            total_quantity=F('total_quantity') + quantity,
+            total_price=F('total_price') + price,
+        )
+
+    def with_actual_totals(self):
+        """
+        Annotate totals computed from added cart items rows.
+        """
+        return self.annotate(**actual_totals())
+
+    def drifted(self):
+        """
+        Carts where stored totals differ from added cart items rows.
+        """
+        return self.with_actual_totals().filter(
+            ~Q(item_count=F('actual_item_count'))
+            | ~Q(total_quantity=F('actual_total_quantity'))
+            | ~Q(total_price=F('actual_total_price'))
+        )
+
+    def refresh_totals(self):
+        """
+        Recompute stored totals from added cart items with one set-based update.
+        """
+        totals = actual_totals()
+        return self.update(
+            item_count=totals['actual_item_count'],
+            total_quantity=totals['actual_total_quantity'],
+            total_price=totals['actual_total_price'],
+        )
+
+def actual_totals():
+    """
+    Subquery expressions for item count, total quantity and total price of added items in cart.
+    """
+    items = CartItem.objects.filter(cart=OuterRef('pk'), status=CartItem.ADDED).order_by().values('cart')
+    return {
+        'actual_item_count': Coalesce(Subquery(items.annotate(value=Count('pk')).values('value')), 0),
+        'actual_total_quantity': Coalesce(Subquery(items.annotate(value=Sum('quantity')).values('value')), 0),
+        'actual_total_price': Round(
+            Coalesce(
+                Subquery(items.annotate(value=Sum(F('product__price') * F('quantity'))).values('value')),
+                Value(Decimal('0')),
+            ),
+            2,
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+
+class VersionConflict(Exception):
+    """
+    Raised when compare-and-swap write finds cart item (or its product) changed since it was read.
+    """
+
+class InsufficientStock(Exception):
+    """
+    Raised when one or more products can not cover the requested quantity.
+    failures is a list of dicts with product, requested and available keys.
+    """
+    def __init__(self, failures):
+        super().__init__('Insufficient stock quantity.')
+        self.failures = failures
 
 class Cart(models.Model):
     """
     Cart Model related to customer one to one rel.
+    item_count, total_quantity and total_price are denormalized totals of added cart items.
     """
     customer = models.OneToOneField('customer.Customer', on_delete=models.CASCADE, verbose_name = _('Customer'))
+    item_count = models.PositiveIntegerField(default=0, verbose_name = _('Item count'))
+    total_quantity = models.PositiveIntegerField(default=0, verbose_name = _('Total quantity'))
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name = _('Total price'))
+
+    objects = CartQuerySet.as_manager()
     
     class Meta:
         ordering = ['-id']
@@ -30,18 +119,317 @@ class CartItem(models.Model):
         (REMOVED, _('Item Removed')),
         (CHECKOUT, _('Item Checkout')),
     )
-    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, verbose_name = _('Cart'))
+    # cart lookups are served by composite indexes leading with cart.
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, db_index = False, verbose_name = _('Cart'))
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name = _('Product'))
     quantity = models.PositiveIntegerField(verbose_name = _('Quantity'))
     status = models.PositiveSmallIntegerField(null = True, blank = True, choices=ITEM_STATUS, default = ADDED, verbose_name = _('status'))
     created_at = models.DateTimeField(auto_now_add=True, db_index = True, verbose_name = _('Created at'))
     updated_at = models.DateTimeField(auto_now=True, db_index = True, verbose_name = _('Updated at'))
+    # incremented by every write, updates compare and swap it instead of locking the row.
+    version = models.PositiveIntegerField(default=0, verbose_name = _('Version'))
     
     class Meta:
         ordering = ['-updated_at']
         verbose_name = _('Cart Item')
         verbose_name_plural = _('Cart Items')
+        indexes = [
+            # checkout and details filter by cart and status.
+            models.Index(fields=['cart', 'status'], name='cart_item_cart_status_idx'),
+            # add item looks up live item of product in cart.
+            models.Index(fields=['cart', 'product'], name='cart_item_cart_product_idx'),
+        ]
+        constraints = [
+            # at most one live (ADDED = 0 or REMOVED = 1) item per product in cart.
+            models.UniqueConstraint(
+                fields=['cart', 'product'],
+                condition=models.Q(status__in=[0, 1]),
+                name='unique_live_cart_item',
+            ),
+        ]
 
     def __str__(self):
         return self.product.name
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_totals = instance.totals_contribution()
+        return instance
+
+    def totals_contribution(self):
+        """
+        Return (item count, quantity) this item adds to cart totals, None when fields are deferred.
+        """
+        deferred = self.get_deferred_fields()
+        if 'status' in deferred or 'quantity' in deferred:
+            return None
+        if self.status == CartItem.ADDED:
+            return 1, self.quantity
+        return 0, 0
+
+    def save(self, *args, **kwargs):
+        """
+        Save cart item, apply its change to cart totals with atomic F() deltas and invalidate cached cart details.
+        Updates are compare-and-swap on version, raise VersionConflict when row changed since it was read.
+        """
+        with transaction.atomic():
+            self._expected_version = None if self._state.adding else self.version
+            if self._expected_version is not None:
+                self.version += 1
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+            try:
+                super().save(*args, **kwargs)
+            except VersionConflict:
+                self.version = self._expected_version
+                raise
+            loaded = getattr(self, '_loaded_totals', (0, 0))
+            current = self.totals_contribution()
+            if loaded is None or current is None:
+                Cart.objects.filter(pk=self.cart_id).refresh_totals()
+            elif loaded != current:
+                quantity = current[1] - loaded[1]
+                # price is read from product row in the same update, loaded product may be a stale snapshot.
+                price = Subquery(Product.objects.filter(pk=self.product_id).values('price')[:1])
+                Cart.objects.filter(pk=self.cart_id).add_totals(current[0] - loaded[0], quantity, price * quantity)
+            self._loaded_totals = current
+            hold_stock([self])
+            cart_detail_cache.invalidate([self.cart_id])
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Update row only if it still has the read version, and loaded product still has its read version
+        so stock and price checked before the write are still current.
+        """
+        if getattr(self, '_expected_version', None) is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        base_qs = base_qs.filter(version=self._expected_version)
+        if CartItem.product.is_cached(self):
+            base_qs = base_qs.filter(product__version=self.product.version)
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            raise VersionConflict()
+        return True
+
+class CartBatch(models.Model):
+    """
+    CartBatch Model for each applied batch of cart operations stored by idempotency key
+    to replay the same results when client retries the same batch.
+    Payload hash tells a retry from a different batch sent with a reused key.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, verbose_name = _('Cart'))
+    idempotency_key = models.CharField(max_length=64, verbose_name = _('Idempotency key'))
+    # sha256 of operations, empty for batches stored before it was recorded.
+    payload_hash = models.CharField(max_length=64, blank=True, default='', verbose_name = _('Payload hash'))
+    results = models.JSONField(verbose_name = _('Results'))
+    created_at = models.DateTimeField(auto_now_add=True, db_index = True, verbose_name = _('Created at'))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('Cart Batch')
+        verbose_name_plural = _('Cart Batches')
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'idempotency_key'], name='unique_cart_batch_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return self.idempotency_key
+
+class ArchivedCartItem(models.Model):
+    """
+    ArchivedCartItem Model for removed and checked out cart items moved out of cart items table by
+    archive_cart_history, keeping original id and timestamps and product name and price at archival.
+    Rows are written once and never updated.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name = _('Cart item'))
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, db_index = False, verbose_name = _('Cart'))
+    # products may be deleted later, history keeps their id and name without a foreign key.
+    product_id = models.PositiveBigIntegerField(verbose_name = _('Product'))
+    product_name = models.CharField(max_length=100, verbose_name = _('Product name'))
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name = _('Price'))
+    quantity = models.PositiveIntegerField(verbose_name = _('Quantity'))
+    status = models.PositiveSmallIntegerField(choices=CartItem.ITEM_STATUS, verbose_name = _('status'))
+    created_at = models.DateTimeField(verbose_name = _('Created at'))
+    updated_at = models.DateTimeField(verbose_name = _('Updated at'))
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name = _('Archived at'))
+
+    class Meta:
+        ordering = ['-updated_at']
+        verbose_name = _('Archived Cart Item')
+        verbose_name_plural = _('Archived Cart Items')
+        indexes = [
+            # history lists archived items of cart newest first (keyset on updated_at, id).
+            models.Index(fields=['cart', 'updated_at', 'id'], name='archived_item_cart_updated_idx'),
+        ]
+
+    def __str__(self):
+        return self.product_name
+
+def invalidate_product_carts(product_ids):
+    """
+    Invalidate cached details of every cart listing products, cart details render their stock and price.
+    """
+    cart_detail_cache.invalidate(
+        CartItem.objects.filter(product_id__in=product_ids).values_list('cart_id', flat=True).distinct()
+    )
+
+class StockReservationQuerySet(models.QuerySet):
+    """
+    StockReservation QuerySet to release holds back to available stock.
+    """
+    def expired(self, now=None):
+        return self.filter(expires_at__lte=now or timezone.now())
+
+    def release(self):
+        """
+        Delete holds and give their quantity back to product reserved counters in one update.
+        Raise VersionConflict when some hold was already released or converted meanwhile.
+        """
+        with transaction.atomic():
+            holds = list(self.order_by().values_list('id', 'product_id', 'quantity'))
+            if not holds:
+                return 0
+            deleted, _ = StockReservation.objects.filter(pk__in=[hold_id for hold_id, _, _ in holds]).delete()
+            if deleted != len(holds):
+                raise VersionConflict()
+            released = {}
+            for _, product_id, quantity in holds:
+                released[product_id] = released.get(product_id, 0) + quantity
+            Product.objects.filter(pk__in=released).update(
+                reserved_quantity=F('reserved_quantity') - Case(
+                    *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in released.items()]
+                ),
+                updated_at=timezone.now(),
+            )
+            invalidate_product_carts(released)
+            return deleted
+
+class StockReservation(models.Model):
+    """
+    StockReservation Model for stock held by added cart item until it expires, is checked out or released.
+    Product.reserved_quantity is the maintained sum of holds, available stock is stock_quantity minus it.
+    """
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name='reservation', verbose_name = _('Cart item'))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name = _('Product'))
+    quantity = models.PositiveIntegerField(verbose_name = _('Quantity'))
+    # sweeper releases expired holds in expiry order.
+    expires_at = models.DateTimeField(db_index = True, verbose_name = _('Expires at'))
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['expires_at']
+        verbose_name = _('Stock Reservation')
+        verbose_name_plural = _('Stock Reservations')
+
+    def __str__(self):
+        return f'{self.product_id} x {self.quantity}'
+
+def reservation_expiry():
+    return timezone.now() + datetime.timedelta(seconds=getattr(settings, 'CART_RESERVATION_TTL', 900))
+
+def hold_stock(items, held=None):
+    """
+    Make stock holds of cart items match their added quantity with fresh expiry
+     - current holds (cart item id -> (hold id, quantity)) are read in one query unless given.
+     - reserved counters of all touched products change in one conditional update
+       that refuses to hold more than stock on hand.
+     - old holds are replaced with one delete and one bulk insert.
+    Raise InsufficientStock when stock can not cover new holds, VersionConflict when
+    holds were released concurrently.
+    """
+    if held is None:
+        held = {
+            cart_item_id: (hold_id, quantity)
+            for hold_id, cart_item_id, quantity in StockReservation.objects.filter(cart_item__in=items)
+            .order_by().values_list('id', 'cart_item_id', 'quantity')
+        }
+    held = {item.pk: held[item.pk] for item in items if item.pk in held}
+    deltas = {}
+    for item in items:
+        target = item.quantity if item.status == CartItem.ADDED else 0
+        deltas[item.product_id] = deltas.get(item.product_id, 0) + target - held.get(item.pk, (None, 0))[1]
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if deltas:
+        available = Q()
+        for product_id, delta in deltas.items():
+            if delta > 0:
+                available |= Q(pk=product_id, stock_quantity__gte=F('reserved_quantity') + delta)
+            else:
+                available |= Q(pk=product_id)
+        updated = Product.objects.filter(available).update(
+            reserved_quantity=F('reserved_quantity') + Case(
+                *[When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()]
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated != len(deltas):
+            raise InsufficientStock([])
+        invalidate_product_carts(deltas)
+    if held:
+        deleted, _ = StockReservation.objects.filter(pk__in=[hold_id for hold_id, _ in held.values()]).delete()
+        if deleted != len(held):
+            raise VersionConflict()
+    expires_at = reservation_expiry()
+    StockReservation.objects.bulk_create([
+        StockReservation(cart_item=item, product_id=item.product_id, quantity=item.quantity, expires_at=expires_at)
+        for item in items
+        if item.status == CartItem.ADDED
+    ])
+
+@receiver(pre_delete, sender=Cart)
+def release_deleted_cart_stock(sender, instance, **kwargs):
+    """
+    Signal receiver function to give stock held by cart items back before they are deleted with cart.
+    """
+    StockReservation.objects.filter(cart_item__cart=instance).release()
+
+@receiver(pre_delete, sender=Product)
+def collect_carts_for_deleted_product(sender, instance, **kwargs):
+    """
+    Signal receiver function to remember carts holding product before its cart items are deleted.
+    """
+    instance._cart_ids = list(
+        Cart.objects.filter(cartitem__product=instance, cartitem__status=CartItem.ADDED).values_list('pk', flat=True)
+    )
+
+@receiver(post_delete, sender=Product)
+def refresh_cart_totals_for_deleted_product(sender, instance, **kwargs):
+    """
+    Signal receiver function to refresh totals of carts that held deleted product.
+    """
+    cart_ids = getattr(instance, '_cart_ids', None)
+    if cart_ids:
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
+        cart_detail_cache.invalidate(cart_ids)
+
+@receiver(post_save, sender=Product)
+def refresh_cart_totals_for_product(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Signal receiver function to refresh totals of carts holding product when its price may have changed
+    and invalidate cached details of carts listing product.
+    """
+    if created:
+        return
+    if update_fields is None or 'price' in update_fields:
+        Cart.objects.filter(cartitem__product=instance, cartitem__status=CartItem.ADDED).refresh_totals()
+    invalidate_product_carts([instance.pk])
+
+@receiver(products_bulk_updated, sender=Product)
+def refresh_cart_totals_for_bulk_products(sender, skus, **kwargs):
+    """
+    Signal receiver function to refresh totals and invalidate cached details of carts
+    holding products written in bulk.
+    """
+    Cart.objects.filter(cartitem__product__sku__in=skus, cartitem__status=CartItem.ADDED).refresh_totals()
+    cart_detail_cache.invalidate(
+        CartItem.objects.filter(product__sku__in=skus).values_list('cart_id', flat=True).distinct()
+    )
+
+@receiver(post_save, sender=Cart)
+def invalidate_new_cart_details(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to drop any cached details left for reused cart id.
+    """
+    if created:
+        cart_detail_cache.invalidate([instance.pk])
@@ -1,40 +1,92 @@
-from django.db.models import Sum, F
+from django.db import IntegrityError, transaction
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from .models import Cart, CartItem
-from customer.serializers import CustomerListSerializer
+from api.fastpath import compile_serializer
+from api.sparse import SparseFieldsMixin
+from product.models import Product
+from .models import ArchivedCartItem, Cart, CartItem, InsufficientStock, VersionConflict
+from .services import version_attempts
+from product.cache import product_snapshots
 from product.serializers import ProductListSerializer
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
-    CartItem Serializer to serializer all data about cart items and associated products.
+    CartItem Serializer to serializer all data about cart items and associated products,
+    with a sparse fieldset product is nested only when expanded.
     """
     product = ProductListSerializer()
+    expandable_fields = ('product',)
     class Meta:
         model = CartItem
         fields = '__all__'
 
+class ProductSnapshotField(serializers.PrimaryKeyRelatedField):
+    """
+    Product primary key field resolved from per process product snapshots instead of a product row query,
+    the product has snapshot fields loaded and the others deferred.
+    """
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            product_id = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        snapshot = product_snapshots.get(product_id)
+        if snapshot is None:
+            self.fail('does_not_exist', pk_value=data)
+        return snapshot.as_product()
+
 class CartItemAddSerializer(serializers.ModelSerializer):
     """
     CartItemAdd Serializer to add item product to cart and check if
      - quantity greater than zero    
-     - product has stock to add it that greater than quantity.
+     - product has stock to add it that greater than quantity, saved item holds it (StockReservation).
      - product already added before override it with new quantity
      - product already removed before overrid it with new quantity.
+    live item override is compare-and-swap on item and product versions without locking,
+    unique_live_cart_item turns a concurrent insert into override, lost races are tried again.
+    product and its stock are read from snapshots, holding stock checks it against the row.
     """
+    product = ProductSnapshotField(queryset=Product.objects.all())
     class Meta:
         model = CartItem
         fields = '__all__'
+        read_only_fields = ['version']
     
     def create(self, validated_data):
-        try:
-            cart_item = CartItem.objects.get(cart=validated_data['cart'], product=validated_data['product'], status__in = [CartItem.ADDED, CartItem.REMOVED])
+        product = validated_data['product']
+        live_items = CartItem.objects.filter(
+            cart=validated_data['cart'], product=product, status__in = [CartItem.ADDED, CartItem.REMOVED]
+        )
+        for attempt in range(version_attempts()):
+            if attempt:
+                # product may have changed, check stock again against the current row.
+                product_snapshots.invalidate([product.pk])
+                product.refresh_from_db()
+                self.validate(validated_data)
+            cart_item = live_items.first()
+            if cart_item is None:
+                try:
+                    with transaction.atomic():
+                        return super().create(validated_data)
+                except IntegrityError:
+                    # concurrent add inserted live item first (unique_live_cart_item), override it instead.
+                    continue
+                except InsufficientStock:
+                    raise serializers.ValidationError({"non_field_errors": ["Insufficient stock quantity."]})
             if cart_item.status == CartItem.REMOVED:
                 cart_item.status = CartItem.ADDED
+            cart_item.product = product
             cart_item.quantity = validated_data['quantity']
-            cart_item.save()
+            try:
+                cart_item.save()
+            except VersionConflict:
+                continue
+            except InsufficientStock:
+                raise serializers.ValidationError({"non_field_errors": ["Insufficient stock quantity."]})
             return cart_item
-        except CartItem.DoesNotExist:
-            return super().create(validated_data)
+        raise VersionConflict()
             
         
     def validate_quantity(self, value):
@@ -48,7 +100,11 @@ class CartItemAddSerializer(serializers.ModelSerializer):
         
         # Check if product stock is greater than or equal to quantity
         if product.stock_quantity < quantity:
-            raise serializers.ValidationError("Insufficient stock quantity.")
+            # snapshot may be stale, reject only against the current row.
+            product_snapshots.invalidate([product.pk])
+            product.refresh_from_db()
+            if product.stock_quantity < quantity:
+                raise serializers.ValidationError("Insufficient stock quantity.")
         return attrs   
    
 class CartItemRemoveSerializer(serializers.ModelSerializer):
@@ -78,7 +134,11 @@ class CartItemUpdateQuantitySerializer(serializers.ModelSerializer):
         fields = ['quantity']
     
     def update(self, instance, validated_data):
-        return super().update(instance, validated_data)
+        try:
+            return super().update(instance, validated_data)
+        except InsufficientStock:
+            # stock held by other carts, checked when this item holds the new quantity.
+            raise serializers.ValidationError({"non_field_errors": ["Insufficient stock quantity."]})
             
         
     def validate_quantity(self, value):
@@ -98,20 +158,128 @@ class CartItemUpdateQuantitySerializer(serializers.ModelSerializer):
 class CartDetailSerializer(serializers.ModelSerializer):
     """
     CartDetailSerializer Serializer to serializer data about cart details
-     - product items (cartitem_set)
-     - count for all quantity for each product item
-     - total price for cart items in cart. 
+     - product items (cartitem_set), page of items given in context or all cart items.
+     - count for all quantity for each added product item
+     - total price for added cart items in cart. 
+    count and total price are read from denormalized cart totals, never with extra queries,
+    total price renders as a number and both are null while cart has no added item.
+    With fast in context the items are values_list rows rendered by compiled CartItemSerializer.
+    Items are rendered in sparse fieldset given in context, cart totals always.
     """
-    cartitem_set = CartItemSerializer(many= True)
+    cartitem_set = serializers.SerializerMethodField()
     count = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
     class Meta:
         model = Cart
         fields = ['cartitem_set', 'count', 'total_price']
-        
+
+    @extend_schema_field(serializers.IntegerField(allow_null=True))
     def get_count(self, obj):
-        return obj.cartitem_set.aggregate(count=Sum('quantity'))['count']
+        return obj.total_quantity if obj.item_count else None
 
+    @extend_schema_field(serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False, allow_null=True))
     def get_total_price(self, obj):
-        return obj.cartitem_set.aggregate(total_price=Sum(F('product__price') * F('quantity')))['total_price']
+        return obj.total_price if obj.item_count else None
 
+    @extend_schema_field(CartItemSerializer(many=True))
+    def get_cartitem_set(self, obj):
+        items = self.context.get('items')
+        sparse = self.context.get('sparse')
+        if items is None:
+            items = obj.cartitem_set.select_related('product')
+        elif self.context.get('fast'):
+            return compile_serializer(CartItemSerializer, sparse).many(items)
+        return CartItemSerializer(items, many=True, context={'sparse': sparse}).data
+
+class CartSummarySerializer(serializers.ModelSerializer):
+    """
+    CartSummary Serializer to serializer denormalized totals of added items in cart.
+    """
+    cart = serializers.IntegerField(source='id')
+    class Meta:
+        model = Cart
+        fields = ['cart', 'item_count', 'total_quantity', 'total_price']
+
+class ArchivedCartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    ArchivedCartItem Serializer to serializer archived cart items history.
+    """
+    class Meta:
+        model = ArchivedCartItem
+        fields = '__all__'
+
+class CartDetailFilterSerializer(serializers.Serializer):
+    """
+    CartDetailFilter Serializer to validate optional status filter for listed cart items.
+    """
+    status = serializers.MultipleChoiceField(choices=CartItem.ITEM_STATUS, required=False)
+
+class CartBatchOperationSerializer(serializers.Serializer):
+    """
+    CartBatchOperation Serializer to validate shape of one batch operation, products are checked later in bulk.
+     - add and update operations need quantity greater than zero.
+    """
+    ADD = 'add'
+    REMOVE = 'remove'
+    UPDATE = 'update'
+
+    op = serializers.ChoiceField(choices=[ADD, REMOVE, UPDATE])
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != self.REMOVE:
+            quantity = attrs.get('quantity')
+            if quantity is None or quantity <= 0:
+                raise serializers.ValidationError({"quantity": ["Quantity must be more than zero."]})
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    CartBatch Serializer to validate batch of operations applied on one cart with optional idempotency key,
+    sent in body or as Idempotency-Key header of request given in context.
+    """
+    cart = serializers.PrimaryKeyRelatedField(queryset=Cart.objects.all())
+    idempotency_key = serializers.CharField(max_length=64, required=False)
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        request = self.context.get('request')
+        header = request.headers.get('Idempotency-Key') if request is not None else None
+        if not attrs.get('idempotency_key') and header:
+            try:
+                attrs['idempotency_key'] = self.fields['idempotency_key'].run_validation(header)
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({'idempotency_key': exc.detail})
+        return attrs
+
+class PrimaryKeyInputField(serializers.IntegerField):
+    """
+    Primary key field parsed without database lookup, async views check that objects exist with async ORM.
+    """
+    default_error_messages = {
+        'incorrect_type': 'Incorrect type. Expected pk value, received {data_type}.',
+    }
+
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class CartItemAddInputSerializer(serializers.Serializer):
+    """
+    CartItemAddInput Serializer to validate add item fields for async views like CartItemAddSerializer
+    without database queries, cart, product and stock are checked by the view.
+    """
+    cart = PrimaryKeyInputField()
+    product = PrimaryKeyInputField()
+    quantity = serializers.IntegerField(min_value=0, max_value=2147483647)
+    status = serializers.ChoiceField(choices=CartItem.ITEM_STATUS, required=False, allow_null=True)
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be more than zero.")
+        return value
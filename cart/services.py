@@ -0,0 +1,374 @@
+import datetime
+import hashlib
+import json
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from jobs.services import enqueue_on_commit
+from product.cache import product_snapshots
+from product.models import Product
+from .cache import cart_detail_cache
+from .models import (
+    ArchivedCartItem, Cart, CartBatch, CartItem, InsufficientStock, StockReservation, VersionConflict, hold_stock,
+    invalidate_product_carts
+)
+
+
+class EmptyCart(Exception):
+    """
+    Raised when checkout is requested for a cart without added items.
+    """
+
+
+class IdempotencyKeyReused(Exception):
+    """
+    Raised when idempotency key of a stored batch is sent again with different operations.
+    """
+
+
+def version_attempts():
+    return getattr(settings, 'CART_VERSION_ATTEMPTS', 3)
+
+
+def checkout_cart(cart_id, attempts=None):
+    """
+    Checkout all added items in cart inside one transaction with constant query count
+     - read added items (id, product, quantity, version) and their stock holds without locking them.
+     - delete holds and convert them to stock decrements for all products in one set-based update,
+       quantity not covered by a live hold must fit in available stock so nothing is oversold.
+     - move all items to checkout status in one compare-and-swap update on their versions.
+     - refresh cart totals in one set-based update.
+     - enqueue reserved stock reconciliation and checkout notification jobs once the transaction commits.
+    Checkout is retried when items change meanwhile, up to attempts times.
+    Return number of checked out items, raise EmptyCart, InsufficientStock or VersionConflict.
+    """
+    attempts = attempts or version_attempts()
+    for attempt in range(attempts):
+        try:
+            return _checkout_cart(cart_id)
+        except VersionConflict:
+            if attempt == attempts - 1:
+                raise
+
+
+def _checkout_cart(cart_id):
+    try:
+        with transaction.atomic():
+            items = list(
+                CartItem.objects.filter(cart_id=cart_id, status=CartItem.ADDED)
+                .order_by()
+                .values_list('id', 'product_id', 'quantity', 'version', 'reservation__id', 'reservation__quantity')
+            )
+            if not items:
+                raise EmptyCart()
+
+            required, held, holds = {}, {}, []
+            for _, product_id, quantity, _, hold_id, hold_quantity in items:
+                required[product_id] = required.get(product_id, 0) + quantity
+                if hold_id is not None:
+                    held[product_id] = held.get(product_id, 0) + hold_quantity
+                    holds.append(hold_id)
+            if holds:
+                deleted, _ = StockReservation.objects.filter(pk__in=holds).delete()
+                if deleted != len(holds):
+                    # sweeper released a hold meanwhile, start again with current holds.
+                    raise VersionConflict()
+
+            in_stock = Q()
+            for product_id, quantity in required.items():
+                in_stock |= Q(
+                    pk=product_id,
+                    stock_quantity__gte=F('reserved_quantity') + quantity - held.get(product_id, 0),
+                )
+            decrement = Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in required.items()])
+            release = Case(
+                *[When(pk=product_id, then=Value(held.get(product_id, 0))) for product_id in required]
+            )
+            # holds are already counted as unavailable, converting them leaves available stock and version untouched.
+            updated = Product.objects.filter(in_stock).update(
+                stock_quantity=F('stock_quantity') - decrement, reserved_quantity=F('reserved_quantity') - release,
+                updated_at=timezone.now(),
+            )
+            if updated != len(required):
+                # roll back the partial decrement, failures are reported outside the transaction.
+                raise InsufficientStock([])
+
+            unchanged = Q()
+            for item_id, _, _, version, _, _ in items:
+                unchanged |= Q(pk=item_id, version=version, status=CartItem.ADDED)
+            updated = CartItem.objects.filter(unchanged).update(
+                status=CartItem.CHECKOUT, updated_at=timezone.now(), version=F('version') + 1
+            )
+            if updated != len(items):
+                # an item changed after it was read, roll back the stock decrement and start again.
+                raise VersionConflict()
+            Cart.objects.filter(pk=cart_id).refresh_totals()
+            # other carts listing checked out products render their stock too, this cart among them.
+            invalidate_product_carts(required)
+            product_snapshots.invalidate(required)
+            enqueue_on_commit('cart.reconcile_reserved_stock', {'product_ids': sorted(required)})
+            enqueue_on_commit('cart.checkout_completed', {'cart_id': int(cart_id), 'items': [item_id for item_id, *_ in items]})
+    except InsufficientStock:
+        raise InsufficientStock(_stock_failures(required, held))
+    return len(items)
+
+
+def _stock_failures(required, held):
+    """
+    Return products from required (product id -> quantity) whose available stock plus cart holds can not cover it.
+    """
+    stocks = Product.objects.filter(pk__in=required).values_list('id', 'stock_quantity', 'reserved_quantity')
+    failures = []
+    for product_id, stock_quantity, reserved_quantity in stocks:
+        available = stock_quantity - reserved_quantity + held.get(product_id, 0)
+        if available < required[product_id]:
+            failures.append({'product': product_id, 'requested': required[product_id], 'available': available})
+    return failures
+
+
+def cart_items_queryset(cart_id, statuses=None):
+    """
+    Cart items queryset for details view with their products, optionally filtered by status.
+    """
+    items = CartItem.objects.filter(cart_id=cart_id).select_related('product')
+    if statuses:
+        items = items.filter(status__in=statuses)
+    return items
+
+
+def apply_batch(cart, operations, idempotency_key=None, attempts=None):
+    """
+    Apply list of cart operations (add, remove, update) in one transaction
+     - products are loaded with one in_bulk query and live items with one query.
+     - new items are inserted with bulk_create and changed items with one compare-and-swap update.
+     - stock holds of written items are replaced and product reserved counters updated in bulk.
+     - cart totals are refreshed in one set-based update.
+     - results are stored by idempotency key so a retried batch replays them, a different batch
+      sent with the same key raises IdempotencyKeyReused.
+    A batch that loses an insert race on unique_live_cart_item or finds changed items is applied again.
+    Return (results, replayed) where results has one entry per operation.
+    """
+    attempts = attempts or version_attempts()
+    payload_hash = batch_payload_hash(operations) if idempotency_key else ''
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                if idempotency_key:
+                    batch = CartBatch.objects.filter(cart=cart, idempotency_key=idempotency_key).first()
+                    if batch is not None:
+                        return _replay(batch, payload_hash), True
+                results = _apply_operations(cart, operations)
+                if idempotency_key:
+                    CartBatch.objects.create(
+                        cart=cart, idempotency_key=idempotency_key, payload_hash=payload_hash, results=results
+                    )
+            return results, False
+        except (IntegrityError, VersionConflict):
+            # concurrent request with same key won the race, its changes are kept and ours are rolled back.
+            batch = CartBatch.objects.filter(cart=cart, idempotency_key=idempotency_key).first() if idempotency_key else None
+            if batch is not None:
+                return _replay(batch, payload_hash), True
+            if attempt == attempts - 1:
+                raise
+
+
+def batch_payload_hash(operations):
+    """
+    Return sha256 of validated operations, same for every retry of a batch whatever its key order.
+    """
+    payload = json.dumps(operations, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(batch, payload_hash):
+    if batch.payload_hash and batch.payload_hash != payload_hash:
+        raise IdempotencyKeyReused
+    return batch.results
+
+
+def _apply_operations(cart, operations):
+    """
+    Validate operations against in memory cart state and write changes in bulk.
+    """
+    product_ids = {operation['product'] for operation in operations}
+    products = Product.objects.in_bulk(product_ids)
+    items = {
+        item.product_id: item
+        for item in CartItem.objects.filter(cart=cart, product_id__in=product_ids, status__in=[CartItem.ADDED, CartItem.REMOVED])
+        .select_related('reservation')
+    }
+    held = {}
+    for item in items.values():
+        try:
+            held[item.pk] = (item.reservation.pk, item.reservation.quantity)
+        except StockReservation.DoesNotExist:
+            pass
+    created, changed = {}, {}
+    applied = []
+    results = []
+    for operation in operations:
+        product_id = operation['product']
+        product = products.get(product_id)
+        item = items.get(product_id)
+        error = None
+        if product is not None:
+            # stock held by this cart item stays available to it.
+            available = product.available_quantity + (held.get(item.pk, (None, 0))[1] if item is not None else 0)
+        if product is None:
+            error = 'Invalid product.'
+        elif operation['op'] == 'add':
+            if available < operation['quantity']:
+                error = 'Insufficient stock quantity.'
+            elif item is None:
+                item = CartItem(cart=cart, product=product, quantity=operation['quantity'], status=CartItem.ADDED)
+                items[product_id] = created[product_id] = item
+            else:
+                item.status = CartItem.ADDED
+                item.quantity = operation['quantity']
+        elif item is None:
+            error = 'Invalid cart item.'
+        elif operation['op'] == 'remove':
+            if item.status == CartItem.REMOVED:
+                error = 'Cart item Already Removed Before.'
+            else:
+                item.status = CartItem.REMOVED
+        elif item.status != CartItem.ADDED:
+            error = 'Invalid cart item.'
+        elif available < operation['quantity']:
+            error = 'Insufficient stock quantity.'
+        else:
+            item.quantity = operation['quantity']
+
+        result = {'op': operation['op'], 'product': product_id}
+        if error is None:
+            result['status'] = 'applied'
+            if product_id not in created:
+                changed[product_id] = item
+            applied.append((result, item))
+        else:
+            result['status'] = 'failed'
+            result['errors'] = [error]
+        results.append(result)
+
+    CartItem.objects.bulk_create(created.values())
+    if changed:
+        _swap_items(list(changed.values()), products)
+    try:
+        hold_stock([*created.values(), *changed.values()], held)
+    except InsufficientStock:
+        # stock was held by other carts after it was read, validate the batch again.
+        raise VersionConflict()
+    Cart.objects.filter(pk=cart.pk).refresh_totals()
+    cart_detail_cache.invalidate([cart.pk])
+    for result, item in applied:
+        result['cart_item'] = item.pk
+    return results
+
+
+def _swap_items(items, products):
+    """
+    Write quantity and status of changed items in one update conditioned on the item and product
+    versions that were read, raise VersionConflict if any of them changed meanwhile.
+    """
+    unchanged = Q()
+    for item in items:
+        unchanged |= Q(pk=item.pk, version=item.version, product__version=products[item.product_id].version)
+    updated = CartItem.objects.filter(unchanged).update(
+        quantity=Case(*[When(pk=item.pk, then=Value(item.quantity)) for item in items]),
+        status=Case(*[When(pk=item.pk, then=Value(item.status)) for item in items]),
+        updated_at=timezone.now(),
+        version=F('version') + 1,
+    )
+    if updated != len(items):
+        raise VersionConflict()
+    for item in items:
+        item.version += 1
+
+
+def release_expired_holds(batch_size=1000, now=None):
+    """
+    Release expired stock holds in batches of batch_size, each batch in its own short transaction
+    so sweeping never holds locks on many product rows at once.
+    Return number of released holds.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        hold_ids = list(StockReservation.objects.expired(now).values_list('pk', flat=True)[:batch_size])
+        if not hold_ids:
+            return released
+        try:
+            released += StockReservation.objects.filter(pk__in=hold_ids).release()
+        except VersionConflict:
+            # some holds were checked out or released meanwhile, next batch reads the remaining ones.
+            continue
+
+
+def archive_cart_items(batch_size=1000, before=None):
+    """
+    Move removed and checked out items last updated before `before` (CART_ARCHIVE_AFTER_DAYS ago by default)
+    to ArchivedCartItem in batches of batch_size, each batch in its own short transaction.
+    Return number of archived items.
+    """
+    before = before or timezone.now() - datetime.timedelta(days=getattr(settings, 'CART_ARCHIVE_AFTER_DAYS', 90))
+    items = CartItem.objects.filter(status__in=[CartItem.REMOVED, CartItem.CHECKOUT], updated_at__lt=before)
+    return _move_to_archive(items, batch_size)
+
+
+def purge_abandoned_carts(batch_size=1000, before=None):
+    """
+    Empty carts whose added items were all last updated before `before` (CART_ABANDONED_AFTER_DAYS ago by default),
+    their stock holds are released and items archived as removed in batches like archive_cart_items.
+    Return number of purged items.
+    """
+    before = before or timezone.now() - datetime.timedelta(days=getattr(settings, 'CART_ABANDONED_AFTER_DAYS', 30))
+    active = CartItem.objects.filter(status=CartItem.ADDED, updated_at__gte=before).values('cart')
+    items = CartItem.objects.filter(status=CartItem.ADDED, updated_at__lt=before).exclude(cart__in=active)
+    return _move_to_archive(items, batch_size, status=CartItem.REMOVED)
+
+
+def _move_to_archive(items, batch_size, status=None):
+    moved = 0
+    while True:
+        item_ids = list(items.order_by('updated_at').values_list('pk', flat=True)[:batch_size])
+        if not item_ids:
+            return moved
+        try:
+            moved += _archive_batch(items.filter(pk__in=item_ids), status)
+        except VersionConflict:
+            # some items changed meanwhile and no longer match, next batch reads the remaining ones.
+            continue
+
+
+def _archive_batch(items, status=None):
+    """
+    Copy items to archive (with status when given) and delete them in one transaction,
+    releasing their stock holds and refreshing totals of their carts.
+    Raise VersionConflict when an item changed between the copy and the delete.
+    """
+    with transaction.atomic():
+        rows = list(items.values_list(
+            'pk', 'cart_id', 'product_id', 'product__name', 'product__price',
+            'quantity', 'status', 'created_at', 'updated_at',
+        ))
+        if not rows:
+            return 0
+        item_ids = [row[0] for row in rows]
+        StockReservation.objects.filter(cart_item__in=item_ids).release()
+        ArchivedCartItem.objects.bulk_create([
+            ArchivedCartItem(
+                id=item_id, cart_id=cart_id, product_id=product_id, product_name=product_name, price=price,
+                quantity=quantity, status=item_status if status is None else status,
+                created_at=created_at, updated_at=updated_at,
+            )
+            for item_id, cart_id, product_id, product_name, price, quantity, item_status, created_at, updated_at in rows
+        ])
+        _, deleted = items.filter(pk__in=item_ids).delete()
+        if deleted.get(CartItem._meta.label, 0) != len(rows):
+            raise VersionConflict()
+        cart_ids = {row[1] for row in rows}
+        if status is not None:
+            Cart.objects.filter(pk__in=cart_ids).refresh_totals()
+        cart_detail_cache.invalidate(cart_ids)
+    return len(rows)
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Sent by checkout_completed job after cart items are checked out, with cart_id and items arguments.
+cart_checked_out = Signal()
@@ -0,0 +1,43 @@
+import logging
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from jobs.services import job
+from product.models import Product
+from .models import Cart, StockReservation
+from .signals import cart_checked_out
+
+logger = logging.getLogger('cart.checkout')
+
+
+@job('cart.reconcile_reserved_stock')
+def reconcile_reserved_stock(product_ids):
+    """
+    Reset reserved counters of products that drifted from the sum of their live stock holds.
+    Products are locked first so holds taken meanwhile are committed before their sums are read.
+    Return number of corrected products.
+    """
+    with transaction.atomic():
+        locked = list(Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk').values_list('pk', flat=True))
+        held = Coalesce(
+            Subquery(
+                StockReservation.objects.filter(product=OuterRef('pk')).order_by().values('product')
+                .annotate(total=Sum('quantity')).values('total')
+            ),
+            0,
+        )
+        drifted = Product.objects.filter(pk__in=locked).annotate(held=held).exclude(reserved_quantity=F('held'))
+        corrected = drifted.update(reserved_quantity=held, updated_at=timezone.now())
+    if corrected:
+        logger.warning('Corrected reserved stock of %s products.', corrected)
+    return corrected
+
+
+@job('cart.checkout_completed')
+def checkout_completed(cart_id, items):
+    """
+    Notify cart_checked_out receivers of checked out cart items and log the checkout.
+    """
+    cart_checked_out.send(sender=Cart, cart_id=cart_id, items=items)
+    logger.info('Cart %s checked out %s items.', cart_id, len(items))
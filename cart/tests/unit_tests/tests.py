@@ -1,9 +1,30 @@
+import base64
+import datetime
+import json
+import unittest
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.urls import reverse
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
-from cart.models import Cart, CartItem
+from api import renderers
+from cart.cache import cart_detail_cache
+from cart.models import ArchivedCartItem, Cart, CartItem, StockReservation, VersionConflict
+from cart.services import apply_batch, archive_cart_items, checkout_cart, purge_abandoned_carts, InsufficientStock
+from cart.signals import cart_checked_out
+from cart.views import CartViewSet
 from customer.models import Customer
+from jobs.models import Job
+from jobs.services import claim_jobs, run_job
+from product.importer import import_products
 from product.models import Product
 
 class CartAddItemViewTest(TestCase):
@@ -44,6 +65,29 @@ class CartAddItemViewTest(TestCase):
         self.assertEqual(self.exists_cart_item.quantity, 3)
         
 
+    def test_add_to_cart_after_checkout_creates_new_item(self):
+        CartItem.objects.filter(pk=self.exists_cart_item.pk).update(status=CartItem.CHECKOUT)
+        data = {
+            'cart': self.customer.cart.id,
+            'product': self.exists_product.id,
+            'quantity': 2,
+        }
+        response = self.client.post(self.add_item_to_cart, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(response.data['id'], self.exists_cart_item.id)
+
+    def test_one_live_item_per_cart_product(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                CartItem.objects.create(cart=self.customer.cart, product=self.exists_product, quantity=1, status=CartItem.REMOVED)
+
+    def test_add_to_cart_ignores_version(self):
+        data = {'cart': self.customer.cart.id, 'product': self.product.id, 'quantity': 2, 'version': 42}
+        response = self.client.post(self.add_item_to_cart, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['version'], 0)
+        self.assertEqual(CartItem.objects.get(pk=response.data['id']).version, 0)
+
     def test_add_to_cart_invalid_quantity(self):
         data = {
             'cart': self.customer.cart.id,
@@ -178,6 +222,42 @@ class CartCheckoutViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('error', response.data)
 
+    def test_cart_checkout_invalid_cart_id(self):
+        for url in (self.cart_checkout, reverse('cart-async-checkout-items')):
+            response = self.client.post(url, {'cart_id': 'abc'})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cart_checkout_insufficient_stock(self):
+        other_product = Product.objects.create(name='Other Product', price = 100, stock_quantity=10)
+        CartItem.objects.create(cart=self.customer.cart, product=other_product, quantity=5)
+        self.product.stock_quantity = 2
+        self.product.save()
+        data = {
+            'cart_id': self.customer.cart.id
+        }
+        response = self.client.post(self.cart_checkout, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['products'], [{'product': self.product.id, 'requested': 3, 'available': 2}])
+        # nothing is checked out and no stock is decremented
+        other_product.refresh_from_db()
+        self.assertEqual(other_product.stock_quantity, 10)
+        self.assertEqual(self.customer.cart.cartitem_set.filter(status=CartItem.ADDED).count(), 2)
+
+    def test_cart_checkout_constant_query_count(self):
+        products = Product.objects.bulk_create(
+            [Product(name=f'Product {i}', price = 10, stock_quantity=10) for i in range(50)]
+        )
+        CartItem.objects.bulk_create(
+            [CartItem(cart=self.other_customer.cart, product=product, quantity=2) for product in products]
+        )
+        # select items with holds, delete holds, convert holds and decrement stock, update items status,
+        # refresh totals, carts listing products (plus savepoint and release), bulk created items have no holds to delete.
+        with self.assertNumQueries(8):
+            checkout_cart(self.customer.cart.id)
+        with self.assertNumQueries(7):
+            checkout_cart(self.other_customer.cart.id)
+        self.assertEqual(Product.objects.filter(pk__in=[product.pk for product in products], stock_quantity=8).count(), 50)
+
 class CartDetailsViewTest(TestCase):
     """
     Test Cases for Cart Details view.
@@ -207,4 +287,762 @@ class CartDetailsViewTest(TestCase):
             'cart_id': 999 # Invalid cart_item_id
         }
         response = self.client.post(self.cart_details, data)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cart_details_count_total_price_of_added_items(self):
+        removed_product = Product.objects.create(name='Removed Product', price = 100, stock_quantity=10)
+        CartItem.objects.create(cart=self.customer.cart, product=removed_product, quantity=2, status=CartItem.REMOVED)
+        data = {
+            'cart_id': self.customer.cart.id
+        }
+        response = self.client.post(self.cart_details, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['cartitem_set']), 2)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['total_price'], 1500)
+        self.assertIsInstance(response.json()['total_price'], float)
+
+    def test_cart_details_status_filter(self):
+        removed_product = Product.objects.create(name='Removed Product', price = 100, stock_quantity=10)
+        CartItem.objects.create(cart=self.customer.cart, product=removed_product, quantity=2, status=CartItem.REMOVED)
+        data = {
+            'cart_id': self.customer.cart.id,
+            'status': [CartItem.REMOVED],
+        }
+        response = self.client.post(self.cart_details, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['product']['id'] for item in response.data['cartitem_set']], [removed_product.id])
+        self.assertEqual(response.data['count'], 3)
+
+    def test_cart_details_keyset_pages(self):
+        products = Product.objects.bulk_create(
+            [Product(name=f'Product {i}', price = 10, stock_quantity=10) for i in range(5)]
+        )
+        CartItem.objects.bulk_create(
+            [CartItem(cart=self.customer.cart, product=product, quantity=1) for product in products]
+        )
+        # items sharing same updated_at are ordered by id
+        CartItem.objects.filter(cart=self.customer.cart).update(updated_at=self.cart_item.updated_at)
+        cart_detail_cache.invalidate([self.customer.cart.pk])
+        data = {
+            'cart_id': self.customer.cart.id
+        }
+        url, seen = f'{self.cart_details}?page_size=2', []
+        while url:
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['cartitem_set'])
+            url = response.data['next']
+        self.assertEqual(seen, list(CartItem.objects.filter(cart=self.customer.cart).order_by('-id').values_list('id', flat=True)))
+
+    def test_cart_details_fixed_query_count(self):
+        data = {
+            'cart_id': self.other_customer.cart.id
+        }
+        query_counts = set()
+        for size in [1, 10, 100, 1000]:
+            CartItem.objects.filter(cart=self.other_customer.cart).delete()
+            products = Product.objects.bulk_create(
+                [Product(name=f'Product {i}', price = 10, stock_quantity=10) for i in range(size)]
+            )
+            CartItem.objects.bulk_create(
+                [CartItem(cart=self.other_customer.cart, product=product, quantity=1) for product in products]
+            )
+            Cart.objects.filter(pk=self.other_customer.cart.pk).refresh_totals()
+            cart_detail_cache.invalidate([self.other_customer.cart.pk])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.cart_details, data)
+            self.assertEqual(len(response.data['cartitem_set']), min(size, 100))
+            self.assertEqual(response.data['count'], size)
+            query_counts.add(len(queries))
+        self.assertEqual(query_counts, {2})
+class CartBatchViewTest(TestCase):
+    """
+    Test Cases for Cart Batch view.
+    """
+    def setUp(self):
+        # Create test data
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.other_product = Product.objects.create(name='Other Product', price = 100, stock_quantity=10)
+        self.removed_product = Product.objects.create(name='Removed Product', price = 100, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.removed_item = CartItem.objects.create(cart=self.customer.cart, product=self.removed_product, quantity=3, status=CartItem.REMOVED)
+        self.cart_batch = reverse('cart-batch')
+
+    def test_cart_batch_success(self):
+        data = {
+            'cart': self.customer.cart.id,
+            'operations': [
+                {'op': 'update', 'product': self.product.id, 'quantity': 4},
+                {'op': 'add', 'product': self.other_product.id, 'quantity': 2},
+                {'op': 'add', 'product': self.removed_product.id, 'quantity': 1},
+                {'op': 'add', 'product': self.product.id, 'quantity': 20},
+                {'op': 'remove', 'product': 999},
+            ]
+        }
+        response = self.client.post(self.cart_batch, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['applied', 'applied', 'applied', 'failed', 'failed'])
+        self.assertEqual(results[3]['errors'], ['Insufficient stock quantity.'])
+        self.assertEqual(results[4]['errors'], ['Invalid product.'])
+        self.cart_item.refresh_from_db()
+        self.removed_item.refresh_from_db()
+        self.assertEqual(self.cart_item.quantity, 4)
+        self.assertEqual(self.removed_item.status, CartItem.ADDED)
+        self.assertEqual(self.customer.cart.cartitem_set.filter(status=CartItem.ADDED).count(), 3)
+        self.assertEqual(results[1]['cart_item'], CartItem.objects.get(product=self.other_product).id)
+
+    def test_cart_batch_idempotency_key_replay(self):
+        data = {
+            'cart': self.customer.cart.id,
+            'idempotency_key': 'sync-1',
+            'operations': [
+                {'op': 'remove', 'product': self.product.id},
+            ]
+        }
+        response = self.client.post(self.cart_batch, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['status'], 'applied')
+        # retry returns stored results instead of failing on already removed item
+        response = self.client.post(self.cart_batch, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['status'], 'applied')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        data['operations'] = [{'op': 'add', 'product': self.other_product.id, 'quantity': 1}]
+        response = self.client.post(self.cart_batch, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(CartItem.objects.filter(product=self.other_product).exists())
+
+    def test_cart_batch_idempotency_key_header(self):
+        data = {
+            'cart': self.customer.cart.id,
+            'operations': [
+                {'op': 'remove', 'product': self.product.id},
+            ]
+        }
+        response = self.client.post(self.cart_batch, data, format='json', HTTP_IDEMPOTENCY_KEY='x' * 65)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('idempotency_key', response.data)
+        response = self.client.post(self.cart_batch, data, format='json', HTTP_IDEMPOTENCY_KEY='header-1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.cart_batch, data, format='json', HTTP_IDEMPOTENCY_KEY='header-1')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_cart_batch_invalid_quantity(self):
+        data = {
+            'cart': self.customer.cart.id,
+            'operations': [
+                {'op': 'add', 'product': self.other_product.id, 'quantity': 0},
+            ]
+        }
+        response = self.client.post(self.cart_batch, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cart_batch_constant_query_count(self):
+        products = Product.objects.bulk_create(
+            [Product(name=f'Product {i}', price = 10, stock_quantity=10) for i in range(20)]
+        )
+        operations = [{'op': 'add', 'product': product.id, 'quantity': 1} for product in products]
+        operations.append({'op': 'update', 'product': self.product.id, 'quantity': 2})
+        # savepoint, products, items with holds, bulk_create, swap update, reserve stock,
+        # carts listing products, delete old holds, insert holds, refresh totals, release
+        with self.assertNumQueries(11):
+            apply_batch(self.customer.cart, operations)
+
+
+class CartTotalsTest(TestCase):
+    """
+    Test Cases for denormalized cart totals.
+    """
+    def setUp(self):
+        # Create test data
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.other_product = Product.objects.create(name='Other Product', price = 100, stock_quantity=10)
+        self.cart = self.customer.cart
+        self.cart_summary = reverse('cart-summary')
+
+    def assertTotals(self, item_count, total_quantity, total_price):
+        self.cart.refresh_from_db()
+        self.assertEqual(
+            (self.cart.item_count, self.cart.total_quantity, self.cart.total_price),
+            (item_count, total_quantity, total_price),
+        )
+
+    def test_totals_follow_cart_operations(self):
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 2})
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.other_product.id, 'quantity': 3})
+        self.assertTotals(2, 5, 1300)
+        cart_item = CartItem.objects.get(product=self.product)
+        self.client.post(reverse('cart-update-item-quantity'), {'cart_item_id': cart_item.id, 'quantity': 4})
+        self.assertTotals(2, 7, 2300)
+        self.client.post(reverse('cart-remove-item'), {'cart_item_id': cart_item.id})
+        self.assertTotals(1, 3, 300)
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 1})
+        self.assertTotals(2, 4, 800)
+        self.client.post(reverse('cart-checkout-items'), {'cart_id': self.cart.id})
+        self.assertTotals(0, 0, 0)
+
+    def test_totals_refresh_on_price_change(self):
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 2})
+        self.product.price = 250
+        self.product.save()
+        self.assertTotals(1, 2, 500)
+
+    def test_cart_summary(self):
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 2})
+        with self.assertNumQueries(1):
+            response = self.client.post(self.cart_summary, {'cart_id': self.cart.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['item_count'], 1)
+        self.assertEqual(response.data['total_quantity'], 2)
+        self.assertEqual(response.data['total_price'], '1000.00')
+        response = self.client.post(self.cart_summary, {'cart_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_repair_cart_totals_command(self):
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=self.product, quantity=2)])
+        with self.assertRaises(CommandError):
+            call_command('repair_cart_totals', '--check', stdout=StringIO())
+        call_command('repair_cart_totals', stdout=StringIO())
+        self.assertTotals(1, 2, 1000)
+        self.assertFalse(Cart.objects.drifted().exists())
+
+    def test_totals_refresh_on_product_import(self):
+        self.product.sku = 'SKU-1'
+        self.product.save()
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 2})
+        import_products(['sku,name,price,stock_quantity\n', 'SKU-1,Test Product,300,10\n'])
+        self.assertTotals(1, 2, 600)
+
+    def test_totals_refresh_on_product_delete(self):
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.product.id, 'quantity': 2})
+        self.client.post(reverse('cart-add-item'), {'cart': self.cart.id, 'product': self.other_product.id, 'quantity': 1})
+        self.product.delete()
+        self.assertTotals(1, 1, 100)
+
+
+class CartDetailCacheTest(TestCase):
+    """
+    Test Cases for cart details cache.
+    """
+    def setUp(self):
+        # Create test data
+        cache.clear()
+        cart_detail_cache.reset_stats()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.cart_details = reverse('cart-items-details')
+        self.data = {'cart_id': self.customer.cart.id}
+
+    def test_cart_details_cache_hit(self):
+        self.client.post(self.cart_details, self.data)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.cart_details, self.data)
+        self.assertEqual(response.data['count'], 3)
+        stats = self.client.get(reverse('cart-cache-stats')).data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_cart_details_fast_path_matches_drf(self):
+        CartItem.objects.create(cart=self.customer.cart, product=Product.objects.create(name='Other', price = 1, stock_quantity=5), quantity=1)
+        fast = self.client.post(f'{self.cart_details}?page_size=1', self.data)
+        cache.clear()
+        with mock.patch.object(CartViewSet, 'fast_serialization', False):
+            drf = self.client.post(f'{self.cart_details}?page_size=1', self.data)
+        self.assertEqual(fast.content, drf.content)
+        self.assertIsNotNone(fast.data['next'])
+
+    def test_cart_details_sparse_fields(self):
+        url = f'{self.cart_details}?fields=id,quantity,product'
+        with CaptureQueriesContext(connection) as queries:
+            fast = self.client.post(url, self.data)
+        self.assertEqual(fast.data['cartitem_set'], [{'id': self.cart_item.id, 'quantity': 3, 'product': self.product.id}])
+        self.assertEqual(fast.data['count'], 3)
+        self.assertFalse([query for query in queries if 'JOIN "product_product"' in query['sql']])
+        cache.clear()
+        with mock.patch.object(CartViewSet, 'fast_serialization', False):
+            with CaptureQueriesContext(connection) as queries:
+                drf = self.client.post(url, self.data)
+        self.assertEqual(fast.content, drf.content)
+        self.assertFalse([query for query in queries if 'JOIN "product_product"' in query['sql']])
+
+    def test_cart_details_expand_product_fields(self):
+        for fast_serialization in (True, False):
+            cache.clear()
+            with mock.patch.object(CartViewSet, 'fast_serialization', fast_serialization):
+                response = self.client.post(f'{self.cart_details}?fields=id,product.name', self.data)
+                self.assertEqual(response.data['cartitem_set'], [{'id': self.cart_item.id, 'product': {'name': 'Test Product'}}])
+                response = self.client.post(f'{self.cart_details}?expand=product', self.data)
+                self.assertEqual(response.data['cartitem_set'][0]['product']['price'], '500.00')
+
+    def test_cart_details_cache_invalidated_by_cart_mutation(self):
+        self.client.post(self.cart_details, self.data)
+        self.client.post(reverse('cart-update-item-quantity'), {'cart_item_id': self.cart_item.id, 'quantity': 5})
+        response = self.client.post(self.cart_details, self.data)
+        self.assertEqual(response.data['count'], 5)
+        self.client.post(reverse('cart-checkout-items'), self.data)
+        response = self.client.post(self.cart_details, self.data)
+        self.assertIsNone(response.data['count'])
+        self.assertIsNone(response.data['total_price'])
+
+    def test_cart_details_cache_keyed_by_cart_pk(self):
+        for url in (self.cart_details, reverse('cart-async-items-details')):
+            padded = {'cart_id': f' 0{self.customer.cart.id}'}
+            self.client.post(url, padded)
+            CartItem.objects.filter(pk=self.cart_item.pk).update(quantity=F('quantity') + 1)
+            cart_detail_cache.invalidate([self.customer.cart.pk])
+            response = self.client.post(url, padded)
+            self.assertEqual(response.json()['cartitem_set'][0]['quantity'], self.cart_item.quantity + 1)
+            self.cart_item.refresh_from_db()
+            self.assertEqual(response.content, self.client.post(url, self.data).content)
+        response = self.client.post(self.cart_details, {'cart_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('cart-async-items-details'), {'cart_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cart_details_cache_invalidated_by_other_cart_stock_changes(self):
+        other_cart = Customer.objects.create(name='Other').cart
+        self.client.post(self.cart_details, self.data)
+        self.client.post(reverse('cart-add-item'), {'cart': other_cart.id, 'product': self.product.id, 'quantity': 2})
+        response = self.client.post(self.cart_details, self.data)
+        self.assertEqual(response.data['cartitem_set'][0]['product']['reserved_quantity'], 5)
+        self.client.post(reverse('cart-checkout-items'), {'cart_id': other_cart.id})
+        response = self.client.post(self.cart_details, self.data)
+        product = response.data['cartitem_set'][0]['product']
+        self.assertEqual((product['stock_quantity'], product['reserved_quantity']), (8, 3))
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_cart_details_read_from_replica_are_not_cached(self):
+        customer = Customer.objects.create(name='Hassan')
+        for _ in range(2):
+            response = APIClient().post(reverse('cart-items-details'), {'cart_id': customer.cart.id})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cart_detail_cache.stats()['hits'], 0)
+
+    def test_cart_details_cache_invalidated_by_product_price_change(self):
+        self.client.post(self.cart_details, self.data)
+        self.product.price = 100
+        self.product.save()
+        response = self.client.post(self.cart_details, self.data)
+        self.assertEqual(response.data['total_price'], 300)
+        self.assertEqual(response.data['cartitem_set'][0]['product']['price'], '100.00')
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test Cases for ETag of cart details and lists.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.cart_detail = reverse('cart-detail', args=[self.customer.cart.id])
+
+    def test_cart_detail_matches_items_details(self):
+        response = self.client.get(self.cart_detail)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        details = self.client.post(reverse('cart-items-details'), {'cart_id': self.customer.cart.id})
+        self.assertEqual(response.content, details.content)
+        response = self.client.get(reverse('cart-detail', args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cart_detail_invalid_cursor(self):
+        for position in (['x', 'y'], [None, 1], ['2020-01-01T00:00:00+00:00', 'y']):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(self.cart_detail, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cart_detail_not_modified(self):
+        etag = self.client.get(self.cart_detail)['ETag']
+        # cart totals and page validators, nothing is rendered.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.cart_detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertNotEqual(self.client.get(f'{self.cart_detail}?fields=id')['ETag'], etag)
+
+    def test_cart_detail_etag_follows_items_and_products(self):
+        etag = self.client.get(self.cart_detail)['ETag']
+        other_cart = Customer.objects.create(name='Other').cart
+        # another cart holding stock changes reserved quantity of the listed product.
+        CartItem.objects.create(cart=other_cart, product=self.product, quantity=1)
+        response = self.client.get(self.cart_detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cartitem_set'][0]['product']['reserved_quantity'], 4)
+        etag = response['ETag']
+        self.client.post(reverse('cart-update-item-quantity'), {'cart_item_id': self.cart_item.id, 'quantity': 5})
+        response = self.client.get(self.cart_detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+
+    def test_lists_not_modified(self):
+        for url in (reverse('product_list'), reverse('customer_list')):
+            response = self.client.get(url)
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        etag = self.client.get(reverse('product_list'))['ETag']
+        self.product.price = 600
+        self.product.save()
+        response = self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['price'], '600.00')
+
+    def test_list_changes_when_newest_row_is_deleted(self):
+        Product.objects.create(name='Newest Product', price = 1, stock_quantity=1)
+        response = self.client.get(reverse('product_list'))
+        self.assertNotIn('Last-Modified', response)
+        Product.objects.filter(name='Newest Product').delete()
+        response = self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+class CartArchiveTest(TestCase):
+    """
+    Test Cases for cart history archival and abandoned carts purge.
+    """
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.old = timezone.now() - datetime.timedelta(days=100)
+        self.customer = Customer.objects.create(name='Hassan')
+        self.products = [Product.objects.create(name=f'Product {i}', price = 10, stock_quantity=10) for i in range(4)]
+        self.removed = CartItem.objects.create(cart=self.customer.cart, product=self.products[0], quantity=1, status=CartItem.REMOVED)
+        self.checkout = CartItem.objects.create(cart=self.customer.cart, product=self.products[1], quantity=2, status=CartItem.CHECKOUT)
+        self.recent = CartItem.objects.create(cart=self.customer.cart, product=self.products[2], quantity=1, status=CartItem.REMOVED)
+        self.added = CartItem.objects.create(cart=self.customer.cart, product=self.products[3], quantity=3)
+        CartItem.objects.filter(pk__in=[self.removed.pk, self.checkout.pk, self.added.pk]).update(updated_at=self.old)
+
+    def test_archive_moves_old_history(self):
+        self.assertEqual(archive_cart_items(batch_size=1), 2)
+        self.assertEqual(
+            set(CartItem.objects.filter(cart=self.customer.cart).values_list('pk', flat=True)), {self.recent.pk, self.added.pk}
+        )
+        archived = ArchivedCartItem.objects.get(pk=self.checkout.pk)
+        self.assertEqual((archived.product_name, archived.quantity, archived.status), ('Product 1', 2, CartItem.CHECKOUT))
+        self.assertEqual(archived.updated_at, self.old)
+        self.customer.cart.refresh_from_db()
+        self.assertEqual(self.customer.cart.total_quantity, 3)
+
+    def test_history_lists_archived_items(self):
+        archive_cart_items()
+        url = reverse('cart_history', args=[self.customer.cart.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.checkout.pk, self.removed.pk])
+        response = self.client.get(url, {'status': CartItem.REMOVED, 'fields': 'id,product_name'})
+        self.assertEqual(response.data['results'], [{'id': self.removed.pk, 'product_name': 'Product 0'}])
+
+    def test_purge_abandoned_cart(self):
+        active = Customer.objects.create(name='Active').cart
+        CartItem.objects.create(cart=active, product=self.products[0], quantity=1)
+        stale = CartItem.objects.create(cart=active, product=self.products[1], quantity=1)
+        CartItem.objects.filter(pk=stale.pk).update(updated_at=self.old)
+
+        self.assertEqual(purge_abandoned_carts(), 1)
+        self.assertFalse(CartItem.objects.filter(pk=self.added.pk).exists())
+        self.assertTrue(CartItem.objects.filter(pk=stale.pk).exists())
+        self.assertEqual(ArchivedCartItem.objects.get(pk=self.added.pk).status, CartItem.REMOVED)
+        self.assertEqual(Product.objects.get(pk=self.products[3].pk).reserved_quantity, 0)
+        self.customer.cart.refresh_from_db()
+        self.assertEqual((self.customer.cart.item_count, self.customer.cart.total_quantity), (0, 0))
+
+    def test_archive_cart_history_command(self):
+        output = StringIO()
+        call_command('archive_cart_history', '--batch-size', '1', stdout=output)
+        self.assertIn('Archived 2 cart items, purged 1 items of abandoned carts.', output.getvalue())
+        self.assertEqual(ArchivedCartItem.objects.count(), 3)
+
+class CartItemExportViewTest(TestCase):
+    """
+    Test Cases for cart items history export.
+    """
+    def setUp(self):
+        # Create test data
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.other_product = Product.objects.create(name='Other Product', price = 100, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.checkout_item = CartItem.objects.create(cart=self.customer.cart, product=self.other_product, quantity=1, status=CartItem.CHECKOUT)
+        self.cart_export = reverse('cart_export')
+
+    def test_export_ndjson(self):
+        response = self.client.get(self.cart_export, {'cart_id': self.customer.cart.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.cart_item.id, self.checkout_item.id])
+        self.assertEqual(rows[1]['status'], CartItem.CHECKOUT)
+        self.assertEqual(rows[1]['product__name'], 'Other Product')
+
+    def test_export_csv_status_filter(self):
+        response = self.client.get(self.cart_export, {'format': 'csv', 'status': CartItem.CHECKOUT})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'cart_id', 'product_id'])
+        self.assertEqual(len(lines), 2)
+
+    def test_export_invalid_filter(self):
+        response = self.client.get(self.cart_export, {'cart_id': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_data_command(self):
+        output = StringIO()
+        call_command('export_data', 'cart_items', '--status', str(CartItem.ADDED), stdout=output)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.cart_item.id])
+
+    def test_export_includes_archived_items(self):
+        CartItem.objects.filter(pk=self.checkout_item.pk).update(updated_at=timezone.now() - datetime.timedelta(days=100))
+        self.assertEqual(archive_cart_items(), 1)
+        self.other_product.delete()
+        response = self.client.get(self.cart_export, {'cart_id': self.customer.cart.id})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.cart_item.id, self.checkout_item.id])
+        self.assertEqual((rows[1]['status'], rows[1]['product__name']), (CartItem.CHECKOUT, 'Other Product'))
+        output = StringIO()
+        call_command('export_data', 'cart_items', '--format', 'csv', '--status', str(CartItem.CHECKOUT), stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{self.checkout_item.id},{self.customer.cart.id},'))
+
+
+class CartAsyncViewTest(TestCase):
+    """
+    Test Cases for async cart actions keeping CartViewSet contracts.
+    """
+    def setUp(self):
+        # Create test data
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.cart_id = self.customer.cart.id
+
+    async def test_async_add_item_matches_sync_contract(self):
+        product = await Product.objects.acreate(name='Other Product', price = 100, stock_quantity=5)
+        data = {'cart': self.cart_id, 'product': product.id, 'quantity': 2}
+        response = await self.async_client.post(reverse('cart-async-add-item'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['quantity'], 2)
+        self.assertEqual(set(response.json()), {'id', 'cart', 'product', 'quantity', 'status', 'created_at', 'updated_at', 'version'})
+        response = await self.async_client.post(reverse('cart-async-add-item'), dict(data, quantity=4), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await CartItem.objects.filter(cart_id=self.cart_id, product=product).acount(), 1)
+        cart = await Cart.objects.aget(pk=self.cart_id)
+        self.assertEqual((cart.item_count, cart.total_quantity), (2, 7))
+
+    async def test_async_add_item_errors(self):
+        response = await self.async_client.post(reverse('cart-async-add-item'), {'cart': self.cart_id, 'product': 999, 'quantity': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'product': ['Invalid pk "999" - object does not exist.'],
+            'quantity': ['Quantity must be more than zero.'],
+        })
+        response = await self.async_client.post(reverse('cart-async-add-item'), {'cart': self.cart_id, 'product': self.product.id, 'quantity': 11})
+        self.assertEqual(response.json(), {'non_field_errors': ['Insufficient stock quantity.']})
+        response = await self.async_client.get(reverse('cart-async-add-item'))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_sync_add_item_errors_match_async(self):
+        response = self.client.post(reverse('cart-add-item'), {'cart': self.cart_id, 'product': 999, 'quantity': 0})
+        self.assertEqual(response.json(), {
+            'product': ['Invalid pk "999" - object does not exist.'],
+            'quantity': ['Quantity must be more than zero.'],
+        })
+
+    async def test_async_update_and_remove_item(self):
+        response = await self.async_client.post(reverse('cart-async-update-item-quantity'), {'cart_item_id': self.cart_item.id, 'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['quantity'], 5)
+        self.assertEqual(response.json()['product']['name'], 'Test Product')
+        response = await self.async_client.post(reverse('cart-async-remove-item'), {'cart_item_id': self.cart_item.id})
+        self.assertEqual(response.json(), 'Remove Successfully')
+        response = await self.async_client.post(reverse('cart-async-remove-item'), {'cart_item_id': self.cart_item.id})
+        self.assertEqual(response.json(), {'status': ['Cart item Already Removed Before.']})
+        response = await self.async_client.post(reverse('cart-async-update-item-quantity'), {'cart_item_id': self.cart_item.id, 'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        cart = await Cart.objects.aget(pk=self.cart_id)
+        self.assertEqual((cart.item_count, cart.total_quantity), (0, 0))
+
+    def test_async_details_match_sync(self):
+        sync_response = self.client.post(reverse('cart-items-details'), {'cart_id': self.cart_id})
+        async_response = self.client.post(reverse('cart-async-items-details'), {'cart_id': self.cart_id})
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.content, sync_response.content)
+        response = self.client.post(reverse('cart-async-items-details'), {'cart_id': 999})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_details_negotiate_renderer(self):
+        url = reverse('cart-async-items-details')
+        response = self.client.post(url, {'cart_id': self.cart_id}, HTTP_ACCEPT='text/html,*/*;q=0.8')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.client.post(url, {'cart_id': self.cart_id}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    @unittest.skipUnless(renderers.msgpack, 'msgpack is not installed')
+    def test_async_details_msgpack(self):
+        url = reverse('cart-async-items-details')
+        sync_response = self.client.post(reverse('cart-items-details'), {'cart_id': self.cart_id}, HTTP_ACCEPT='application/msgpack')
+        response = self.client.post(url, {'cart_id': self.cart_id}, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(response.content, sync_response.content)
+
+    async def test_async_checkout(self):
+        response = await self.async_client.post(reverse('cart-async-checkout-items'), {'cart_id': self.cart_id})
+        self.assertEqual(response.json(), {'message': 'Cart checked out.'})
+        response = await self.async_client.post(reverse('cart-async-checkout-items'), {'cart_id': self.cart_id})
+        self.assertEqual(response.json(), {'error': 'Cart is empty.'})
+        product = await Product.objects.aget(pk=self.product.pk)
+        self.assertEqual(product.stock_quantity, 7)
+
+
+class CartItemVersionTest(TestCase):
+    """
+    Test Cases for optimistic concurrency on cart item versions.
+    """
+    def setUp(self):
+        # Create test data
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.cart_item = CartItem.objects.create(cart=self.customer.cart, product=self.product, quantity=3)
+        self.update_url = reverse('cart-update-item-quantity')
+
+    def test_stale_save_raises_conflict(self):
+        first = CartItem.objects.get(pk=self.cart_item.pk)
+        second = CartItem.objects.get(pk=self.cart_item.pk)
+        first.quantity = 4
+        first.save()
+        self.assertEqual(first.version, 1)
+        second.quantity = 5
+        with self.assertRaises(VersionConflict):
+            second.save()
+        self.assertEqual(second.version, 0)
+        self.assertEqual(CartItem.objects.get(pk=self.cart_item.pk).quantity, 4)
+        self.assertEqual(Cart.objects.get(pk=self.customer.cart.pk).total_quantity, 4)
+
+    def test_product_change_after_read_raises_conflict(self):
+        cart_item = CartItem.objects.select_related('product').get(pk=self.cart_item.pk)
+        Product.objects.get(pk=self.product.pk).save()
+        cart_item.quantity = 9
+        with self.assertRaises(VersionConflict):
+            cart_item.save()
+
+    def test_stale_client_version_returns_current_state(self):
+        response = self.client.post(self.update_url, {'cart_item_id': self.cart_item.id, 'quantity': 4, 'version': 0})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 1)
+        response = self.client.post(self.update_url, {'cart_item_id': self.cart_item.id, 'quantity': 5, 'version': 0})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['cart_item']['quantity'], 4)
+        self.assertEqual(response.data['cart_item']['version'], 1)
+
+    def test_conflicting_update_is_retried(self):
+        do_update = CartItem._do_update
+        calls = []
+
+        def conflict_once(instance, *args):
+            calls.append(instance.pk)
+            if len(calls) == 1:
+                # concurrent writer wins the first race.
+                CartItem.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+            return do_update(instance, *args)
+
+        with mock.patch.object(CartItem, '_do_update', conflict_once):
+            response = self.client.post(self.update_url, {'cart_item_id': self.cart_item.id, 'quantity': 6})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(calls), 2)
+        # the concurrent bump ran inside the failed save and was rolled back with it.
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(Cart.objects.get(pk=self.customer.cart.pk).total_quantity, 6)
+
+
+class StockReservationTest(TestCase):
+    """
+    Test Cases for stock holds of added cart items.
+    """
+    def setUp(self):
+        # Create test data
+        cache.clear()
+        self.client = APIClient()
+        self.customer = Customer.objects.create(name='Hassan')
+        self.other_customer = Customer.objects.create(name='Ali')
+        self.product = Product.objects.create(name='Test Product', price = 500, stock_quantity=10)
+        self.add_url = reverse('cart-add-item')
+
+    def add(self, customer, quantity):
+        return self.client.post(self.add_url, {'cart': customer.cart.id, 'product': self.product.id, 'quantity': quantity})
+
+    def test_add_update_remove_hold_stock(self):
+        response = self.add(self.customer, 6)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.reserved_quantity, self.product.available_quantity), (6, 4))
+        response = self.add(self.other_customer, 5)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'non_field_errors': ['Insufficient stock quantity.']})
+        cart_item_id = self.customer.cart.cartitem_set.get().id
+        response = self.client.post(reverse('cart-update-item-quantity'), {'cart_item_id': cart_item_id, 'quantity': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reserved_quantity, 10)
+        self.client.post(reverse('cart-remove-item'), {'cart_item_id': cart_item_id})
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reserved_quantity, 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_converts_holds(self):
+        self.add(self.customer, 6)
+        checkout_cart(self.customer.cart.id)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, self.product.reserved_quantity), (4, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_holds_are_released(self):
+        self.add(self.customer, 6)
+        StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        call_command('release_expired_holds', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reserved_quantity, 0)
+        self.assertEqual(self.add(self.other_customer, 5).status_code, status.HTTP_201_CREATED)
+        # released item keeps its quantity but must fit in available stock at checkout.
+        with self.assertRaises(InsufficientStock):
+            checkout_cart(self.customer.cart.id)
+        checkout_cart(self.other_customer.cart.id)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 5)
+
+    def test_deleted_cart_releases_holds(self):
+        self.add(self.customer, 6)
+        self.customer.delete()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reserved_quantity, 0)
+
+    def test_checkout_enqueues_post_processing_jobs(self):
+        self.add(self.customer, 6)
+        cart_item_id = self.customer.cart.cartitem_set.get().id
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout_cart(self.customer.cart.id)
+        self.assertEqual(
+            sorted(Job.objects.values_list('name', flat=True)), ['cart.checkout_completed', 'cart.reconcile_reserved_stock']
+        )
+        # drift left by a lost counter update is corrected by reconciliation.
+        Product.objects.filter(pk=self.product.pk).update(reserved_quantity=3)
+        received = []
+        cart_checked_out.connect(lambda sender, **kwargs: received.append(kwargs['items']), weak=False, dispatch_uid='test')
+        try:
+            with self.assertLogs('cart.checkout', 'INFO'):
+                self.assertEqual([run_job(job) for job in claim_jobs(10)], [Job.DONE, Job.DONE])
+        finally:
+            cart_checked_out.disconnect(dispatch_uid='test')
+        self.assertEqual(received, [[cart_item_id]])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).reserved_quantity, 0)
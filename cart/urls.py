@@ -7,8 +7,11 @@ from .views import (
     # update_cart_item_quantity,
     # cart_checkout,
     # cart_details,
-    CartViewSet
+    CartViewSet,
+    CartItemExportView,
+    CartHistoryView
 )
+from . import async_views
 from rest_framework.routers import DefaultRouter
 router = DefaultRouter()
 router.register(r'', CartViewSet, basename='cart')
@@ -22,4 +25,13 @@ urlpatterns = [
     # path('checkout/', cart_checkout, name='cart_checkout'),
     # path('details/', cart_details, name='cart_details')
 ]
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    path('export/', CartItemExportView.as_view(), name='cart_export'),
+    path('<int:cart_id>/history/', CartHistoryView.as_view(), name='cart_history'),
+    # async variants of cart actions for ASGI servers.
+    path('async/add_item/', async_views.add_item, name='cart-async-add-item'),
+    path('async/remove_item/', async_views.remove_item, name='cart-async-remove-item'),
+    path('async/update_item_quantity/', async_views.update_item_quantity, name='cart-async-update-item-quantity'),
+    path('async/checkout_items/', async_views.checkout_items, name='cart-async-checkout-items'),
+    path('async/items_details/', async_views.items_details, name='cart-async-items-details'),
+] + router.urls
\ No newline at end of file
@@ -1,16 +1,29 @@
-from django.db.models import Sum, F
+from django.core.exceptions import ValidationError
+from drf_spectacular.utils import extend_schema
 from rest_framework import generics, status, viewsets
-from rest_framework.decorators import api_view,action
+from rest_framework.decorators import action
 
-from django.db.models import Prefetch
 from rest_framework.response import Response
-from .models import Cart, CartItem
+from api.conditional import ConditionalListMixin, conditional_response, page_validators, set_validators
+from api.fastpath import FastListMixin, compile_serializer, ordering_fields
+from api.routers import ReplicaReadsMixin, replica_reads
+from api.sparse import SparseFieldset, sparse_queryset
+from api.streaming import ExportView
+from .cache import cart_detail_cache
+from .models import ArchivedCartItem, Cart, CartItem, VersionConflict
 from .serializers import (
     CartItemSerializer, 
     CartItemAddSerializer, 
     CartItemRemoveSerializer, 
     CartItemUpdateQuantitySerializer, 
-    CartDetailSerializer
+    CartDetailSerializer,
+    CartDetailFilterSerializer,
+    ArchivedCartItemSerializer,
+    CartSummarySerializer,
+    CartBatchSerializer
+)
+from .services import (
+    apply_batch, cart_items_queryset, checkout_cart, version_attempts, EmptyCart, IdempotencyKeyReused, InsufficientStock
 )
 class CartViewSet(viewsets.GenericViewSet):
     """
@@ -18,63 +31,291 @@ class CartViewSet(viewsets.GenericViewSet):
      - add product item to cart.
      - remove product item from cart.
      - update quantity for product item in cart.
+     - apply batch of add, remove and update operations on cart.
      - checkout product items in cart.
-     - show details about cart
+     - show details about cart (GET form with ETag for conditional requests)
+     - show summary totals of cart
+     - show cart details cache hit and miss counters
     """
     queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
+    keyset_ordering = ('-updated_at', '-id')
+    # items_details renders items through compiled CartItemSerializer, see api.fastpath.
+    fast_serialization = True
 
     @action(methods=['POST'], detail=False)
     def add_item(self, request):
         serializer = CartItemAddSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        try:
+            serializer.save()
+        except VersionConflict:
+            return Response({'error': 'Cart was changed by another request.'}, status=status.HTTP_409_CONFLICT)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     @action(methods=['POST'], detail=False)
     def remove_item(self, request):
         cart_item_id = request.data.get('cart_item_id', None)
-        try:
-            cart_item = CartItem.objects.get(id=cart_item_id)
-        except CartItem.DoesNotExist:
-            return Response({"error": "Invalid cart item."}, status=status.HTTP_404_NOT_FOUND)
-        serializer = CartItemRemoveSerializer(cart_item, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response("Remove Successfully", status=status.HTTP_200_OK)
+        for attempt in range(version_attempts()):
+            try:
+                cart_item = CartItem.objects.select_related('product').get(id=cart_item_id)
+            except CartItem.DoesNotExist:
+                return Response({"error": "Invalid cart item."}, status=status.HTTP_404_NOT_FOUND)
+            if not matches_version(cart_item, request.data):
+                break
+            serializer = CartItemRemoveSerializer(cart_item, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save()
+            except VersionConflict:
+                if 'version' in request.data:
+                    break
+                continue
+            return Response("Remove Successfully", status=status.HTTP_200_OK)
+        return version_conflict(cart_item_id)
     
     @action(methods=['POST'], detail=False)
     def update_item_quantity(self, request):
         cart_item_id = request.data.get('cart_item_id', None)
-        try:
-            cart_item = CartItem.objects.get(id=cart_item_id, status=CartItem.ADDED)
-        except CartItem.DoesNotExist:
-            return Response({"error": "Invalid cart item."}, status=status.HTTP_404_NOT_FOUND)
-        serializer = CartItemUpdateQuantitySerializer(cart_item, data=request.data, partial=True)
+        for attempt in range(version_attempts()):
+            try:
+                cart_item = CartItem.objects.select_related('product').get(id=cart_item_id, status=CartItem.ADDED)
+            except CartItem.DoesNotExist:
+                return Response({"error": "Invalid cart item."}, status=status.HTTP_404_NOT_FOUND)
+            if not matches_version(cart_item, request.data):
+                break
+            serializer = CartItemUpdateQuantitySerializer(cart_item, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            try:
+                serializer.save()
+            except VersionConflict:
+                if 'version' in request.data:
+                    break
+                continue
+            return Response(self.get_serializer(cart_item).data)
+        return version_conflict(cart_item_id)
+    
+    @action(methods=['POST'], detail=False)
+    def batch(self, request):
+        serializer = CartBatchSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(self.get_serializer(cart_item).data)
+        try:
+            results, replayed = apply_batch(
+                serializer.validated_data['cart'], serializer.validated_data['operations'],
+                serializer.validated_data.get('idempotency_key')
+            )
+        except IdempotencyKeyReused:
+            return Response(
+                {'error': 'Idempotency key was already used for a different batch.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        except VersionConflict:
+            return Response({'error': 'Cart was changed by another request.'}, status=status.HTTP_409_CONFLICT)
+        headers = {'Idempotent-Replayed': 'true'} if replayed else None
+        return Response({'results': results}, status=status.HTTP_200_OK, headers=headers)
     
     @action(methods=['POST'], detail=False)
     def checkout_items(self, request):
-        cart_id = request.data.get('cart_id', None)
-        cart_order_items = CartItem.objects.filter(cart_id = cart_id, status = CartItem.ADDED).all()
-        if len(cart_order_items)==0:
+        cart_id = cart_key(request.data.get('cart_id', None))
+        if cart_id is None:
+            return Response({"error": "Empty cart."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            checkout_cart(cart_id)
+        except EmptyCart:
             return Response({'error': 'Cart is empty.'}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            for cart_item in cart_order_items:
-                cart_item.status = CartItem.CHECKOUT
-                cart_item.save()
-                product = cart_item.product
-                product.stock_quantity -= cart_item.quantity
-                product.save()
+        except InsufficientStock as exc:
+            return Response({'error': 'Insufficient stock quantity.', 'products': exc.failures}, status=status.HTTP_400_BAD_REQUEST)
+        except VersionConflict:
+            return Response({'error': 'Cart was changed by another request.'}, status=status.HTTP_409_CONFLICT)
         return Response({'message': 'Cart checked out.'}, status=status.HTTP_200_OK)
     
     @action(methods=['POST'], detail=False)
     def items_details(self, request):
+        cart_id = cart_key(request.data.get('cart_id', None))
+        filters = CartDetailFilterSerializer(data=request.data)
+        filters.is_valid(raise_exception=True)
+        statuses = filters.validated_data.get('status')
+        sparse = SparseFieldset.from_request(request)
+
+        paginator = self.paginator
+
+        if cart_id is None:
+            return Response({"error": "Empty cart."}, status=status.HTTP_404_NOT_FOUND)
+
+        def build():
+            try:
+                cart = Cart.objects.get(pk=cart_id)
+            except Cart.DoesNotExist:
+                return None
+            items = paginator.paginate_queryset(
+                fast_items(cart_items_queryset(cart.pk, statuses), paginator, self, sparse), request, view=self
+            )
+            context = {'items': items, 'fast': self.fast_serialization, 'sparse': sparse}
+            data = dict(CartDetailSerializer(cart, context=context).data)
+            data['next'] = paginator.get_next_link()
+            return data
+
+        with replica_reads() as routing:
+            # payloads read from a lagging replica could outlive invalidation, only primary reads are cached.
+            data = cart_detail_cache.get_or_build(
+                cart_id, details_variant(request, statuses), build, cacheable=lambda: not routing.used_replica
+            )
+        if data is None:
+            return Response({"error": "Empty cart."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
+
+    @extend_schema(parameters=[CartDetailFilterSerializer], responses={200: CartDetailSerializer})
+    def retrieve(self, request, pk=None):
+        """
+        GET form of items_details for cart pk with status filter as query parameters.
+        ETag is computed from cart totals and versions of page items and their products
+        before rendering, matching If-None-Match is answered with 304.
+        """
+        filters = CartDetailFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        statuses = filters.validated_data.get('status')
+        sparse = SparseFieldset.from_request(request)
+        paginator = self.paginator
+
+        with replica_reads() as routing:
+            try:
+                cart = Cart.objects.only('id', 'item_count', 'total_quantity', 'total_price').get(pk=pk)
+            except (Cart.DoesNotExist, ValueError):
+                return Response({"error": "Empty cart."}, status=status.HTTP_404_NOT_FOUND)
+            versions = page_validators(
+                paginator, cart_items_queryset(cart.pk, statuses), request, self, 'updated_at', 'product__updated_at'
+            )
+            validators = (cart.item_count, cart.total_quantity, cart.total_price, versions)
+            etag, not_modified = conditional_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+
+            def build():
+                items = paginator.paginate_queryset(
+                    fast_items(cart_items_queryset(cart.pk, statuses), paginator, self, sparse), request, view=self
+                )
+                context = {'items': items, 'fast': self.fast_serialization, 'sparse': sparse}
+                data = dict(CartDetailSerializer(cart, context=context).data)
+                data['next'] = paginator.get_next_link()
+                return data
+
+            # payload is cached per representation tag, changed validators never hit an older payload.
+            data = cart_detail_cache.get_or_build(
+                cart.pk, f'{details_variant(request, statuses)}:{etag}', build, cacheable=lambda: not routing.used_replica
+            )
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+    @action(methods=['GET'], detail=False)
+    def cache_stats(self, request):
+        return Response(cart_detail_cache.stats(), status=status.HTTP_200_OK)
+    
+    @action(methods=['POST'], detail=False)
+    def summary(self, request):
         cart_id = request.data.get('cart_id', None)
         try:
-            cart = Cart.objects.select_related('customer').prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('product'))).get(pk=cart_id)
-        except Cart.DoesNotExist:
+            cart = Cart.objects.only('id', 'item_count', 'total_quantity', 'total_price').get(pk=cart_id)
+        except (Cart.DoesNotExist, ValueError):
             return Response({"error": "Empty cart."}, status=status.HTTP_404_NOT_FOUND)
-        return Response(CartDetailSerializer(cart).data, status=status.HTTP_200_OK)
+        return Response(CartSummarySerializer(cart).data, status=status.HTTP_200_OK)
+
+class CartHistoryView(ReplicaReadsMixin, ConditionalListMixin, FastListMixin, generics.ListAPIView):
+    """
+    View to list archived (removed and checked out) items of cart newest first in form of ArchivedCartItemSerializer,
+    optionally filtered by ?status=, items are archived by archive_cart_history command.
+    """
+    serializer_class = ArchivedCartItemSerializer
+    keyset_ordering = ('-updated_at', '-id')
+
+    def get_queryset(self):
+        filters = CartDetailFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        statuses = filters.validated_data.get('status')
+        queryset = ArchivedCartItem.objects.filter(cart_id=self.kwargs['cart_id'])
+        if statuses:
+            queryset = queryset.filter(status__in=statuses)
+        return queryset
+
+    @extend_schema(parameters=[CartDetailFilterSerializer])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+class CartItemExportView(ExportView):
+    """
+    View to stream cart items history (all statuses, checkout included, archived items too) as csv or ndjson
+    optionally filtered by ?cart_id= and ?status=.
+    """
+    queryset = CartItem.objects.all()
+    fields = ('id', 'cart_id', 'product_id', 'product__name', 'quantity', 'status', 'created_at', 'updated_at')
+    # same columns read from archived items, product name is the one kept at archival.
+    archived_fields = ('id', 'cart_id', 'product_id', 'product_name', 'quantity', 'status', 'created_at', 'updated_at')
+    filename = 'cart_items'
+
+    def get_queryset(self):
+        return cart_items_history(self.request.GET.get('cart_id'), self.request.GET.get('status'))
+
+def cart_items_history(cart_id=None, status=None):
+    """
+    Return live and archived cart items as rows of CartItemExportView fields ordered by id,
+    archived items keep their cart item id so both sets never overlap.
+    """
+    live = filter_cart_items(CartItem.objects.order_by(), cart_id, status)
+    archived = filter_cart_items(ArchivedCartItem.objects.order_by(), cart_id, status)
+    return live.values_list(*CartItemExportView.fields).union(
+        archived.values_list(*CartItemExportView.archived_fields), all=True
+    ).order_by('id')
+
+def filter_cart_items(queryset, cart_id=None, status=None):
+    """
+    Filter cart items export by cart and status when given.
+    """
+    if cart_id:
+        queryset = queryset.filter(cart_id=cart_id)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+def fast_items(queryset, paginator, view, sparse=None):
+    """
+    Return cart items queryset as rows for the compiled CartItemSerializer when view uses fast serialization,
+    both paths read only the columns of sparse fieldset.
+    """
+    compiled = compile_serializer(CartItemSerializer, sparse)
+    if not view.fast_serialization:
+        if sparse is None:
+            return queryset
+        return sparse_queryset(queryset, compiled, *ordering_fields(paginator, view))
+    return compiled.values(queryset, *ordering_fields(paginator, view))
+
+def cart_key(cart_id):
+    """
+    Return cart primary key of cart_id sent by client ("01" and " 1" are cart 1) or None when it is not one,
+    cart details are cached by the key invalidation uses.
+    """
+    try:
+        return Cart._meta.pk.to_python(cart_id)
+    except ValidationError:
+        return None
+
+def details_variant(request, statuses):
+    """
+    Cache variant of cart details payload, next link depends on path and query string.
+    """
+    variant = ','.join(str(value) for value in sorted(statuses)) if statuses else 'all'
+    return f"{request.path}:{variant}:{request.query_params.urlencode()}"
+
+def matches_version(cart_item, data):
+    """
+    Check optional version sent by client, a stale version is a conflict that is not retried.
+    """
+    version = data.get('version', None)
+    return version is None or str(version) == str(cart_item.version)
+
+def version_conflict(cart_item_id):
+    """
+    409 response with current state of cart item that changed since it was read.
+    """
+    cart_item = CartItem.objects.select_related('product').filter(id=cart_item_id).first()
+    return Response(
+        {'error': 'Cart item was changed by another request.', 'cart_item': CartItemSerializer(cart_item).data if cart_item else None},
+        status=status.HTTP_409_CONFLICT,
+    )
@@ -9,17 +9,16 @@ class Customer(models.Model):
     """
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
     
 @receiver(post_save, sender=Customer)
-def create_cart_for_new_user(sender, instance, created, **kwargs):
+def create_cart_for_new_user(sender, instance, created, raw=False, **kwargs):
     """
     Signal receiver function to create a Cart when a new User is created.
+    Fixtures (raw) bring their own carts, bulk creation is handled by bulk_create_customers.
     """
-    if created:
+    if created and not raw:
         Cart.objects.create(customer=instance)
-
-# Connect the signal
-post_save.connect(create_cart_for_new_user, sender=Customer)
\ No newline at end of file
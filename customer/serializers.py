@@ -1,7 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
+from api.sparse import SparseFieldsMixin
 from .models import Customer
+from .services import bulk_create_customers
 
-class CustomerListSerializer(serializers.ModelSerializer):
+class CustomerListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
@@ -9,4 +12,21 @@ class CustomerListSerializer(serializers.ModelSerializer):
 class CustomerCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def create(self, validated_data):
+        # customer and its cart (created by post_save receiver) are committed together.
+        with transaction.atomic():
+            return super().create(validated_data)
+
+class CustomerCartSerializer(serializers.ModelSerializer):
+    cart = serializers.IntegerField(source='cart.id', read_only=True)
+    class Meta:
+        model = Customer
+        fields = '__all__'
+
+class CustomerBulkCreateSerializer(serializers.Serializer):
+    customers = CustomerCreateSerializer(many=True, allow_empty=False, max_length=10000)
+
+    def create(self, validated_data):
+        return bulk_create_customers([Customer(**customer) for customer in validated_data['customers']])
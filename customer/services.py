@@ -0,0 +1,22 @@
+from django.db import connection, transaction
+from cart.cache import cart_detail_cache
+from cart.models import Cart
+from .models import Customer
+
+
+def bulk_create_customers(customers, batch_size=1000):
+    """
+    Create customers and their carts with two set-based inserts (per batch) in one transaction.
+    bulk_create skips post_save so carts are created here instead of create_cart_for_new_user.
+    Return created customers with their cart cached on customer.cart.
+    """
+    with transaction.atomic():
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # carts need customer ids, fall back to one save per customer (signal creates cart).
+            for customer in customers:
+                customer.save()
+            return customers
+        Customer.objects.bulk_create(customers, batch_size=batch_size)
+        carts = Cart.objects.bulk_create([Cart(customer=customer) for customer in customers], batch_size=batch_size)
+        cart_detail_cache.invalidate([cart.pk for cart in carts])
+    return customers
@@ -1,8 +1,12 @@
+from unittest import mock
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
+from cart.models import Cart
 from customer.models import Customer
+from customer.services import bulk_create_customers
+from customer.views import CustomerListView
 
 class CustomerListCreateViewTestCase(TestCase):
     """
@@ -20,7 +24,23 @@ class CustomerListCreateViewTestCase(TestCase):
 
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Check the number of customers returned
+        self.assertEqual(len(response.data['results']), 2)  # Check the number of customers returned
+
+    def test_list_customers_fast_path_matches_drf(self):
+        Customer.objects.create(name='Ali')
+        Customer.objects.create(name='Hassan')
+        fast = self.client.get(self.list_url)
+        with mock.patch.object(CustomerListView, 'fast_serialization', False):
+            drf = self.client.get(self.list_url)
+        self.assertEqual(fast.content, drf.content)
+
+    def test_export_customers_ndjson(self):
+        Customer.objects.create(name='Ali')
+        response = self.client.get(reverse('customer_export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('"name":"Ali"', lines[0])
 
     def test_create_customer(self):
         # Create some customers for testing
@@ -30,3 +50,37 @@ class CustomerListCreateViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Customer.objects.count(), 1)  # Check if the customer was created
         self.assertEqual(Customer.objects.first().name, 'Mohamed Ayman')
+
+class CustomerBulkCreateViewTestCase(TestCase):
+    """
+    Test Cases for bulk create customers with their carts.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.bulk_create_url = reverse('customer_bulk_create')
+
+    def test_bulk_create_customers(self):
+        data = {'customers': [{'name': f'Customer {i}'} for i in range(50)]}
+
+        response = self.client.post(self.bulk_create_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Customer.objects.count(), 50)
+        self.assertEqual(Cart.objects.count(), 50)
+        for customer in response.data:
+            self.assertEqual(Cart.objects.get(pk=customer['cart']).customer_id, customer['id'])
+
+    def test_bulk_create_customers_query_count(self):
+        customers = [Customer(name=f'Customer {i}') for i in range(50)]
+        # savepoint, customers insert, carts insert, release
+        with self.assertNumQueries(4):
+            bulk_create_customers(customers)
+
+    def test_bulk_create_customers_invalid(self):
+        response = self.client.post(self.bulk_create_url, {'customers': [{'name': ''}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Customer.objects.count(), 0)
+
+    def test_create_customer_has_one_cart(self):
+        response = self.client.post(reverse('customer_create'), {'name': 'Ali'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Cart.objects.filter(customer_id=response.data['id']).count(), 1)
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import CustomerListView, CustomerCreateView
+from .views import CustomerListView, CustomerCreateView, CustomerBulkCreateView, CustomerExportView
 urlpatterns = [
     path('list/',CustomerListView.as_view(), name='customer_list'),
     path('create/',CustomerCreateView.as_view(), name='customer_create'),
+    path('bulk-create/',CustomerBulkCreateView.as_view(), name='customer_bulk_create'),
+    path('export/',CustomerExportView.as_view(), name='customer_export'),
 ]
\ No newline at end of file
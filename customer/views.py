@@ -1,10 +1,16 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.response import Response
+from api.conditional import ConditionalListMixin
+from api.fastpath import FastListMixin
+from api.routers import ReplicaReadsMixin
+from api.streaming import ExportView
 from .models import Customer
-from .serializers import CustomerListSerializer, CustomerCreateSerializer
+from .serializers import CustomerListSerializer, CustomerCreateSerializer, CustomerBulkCreateSerializer, CustomerCartSerializer
 
-class CustomerListView(generics.ListAPIView):
+class CustomerListView(ReplicaReadsMixin, ConditionalListMixin, FastListMixin, generics.ListAPIView):
     """
-    View to list all serilized customer in form of CustomerListSerializer.
+    View to list all serilized customer in form of CustomerListSerializer, read from replica when configured,
+    pages carry ETag for conditional GET.
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerListSerializer
@@ -16,3 +22,23 @@ class CustomerCreateView(generics.CreateAPIView):
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerCreateSerializer
+
+class CustomerBulkCreateView(generics.GenericAPIView):
+    """
+    View to create many customers with their carts in form of CustomerBulkCreateSerializer.
+    """
+    serializer_class = CustomerBulkCreateSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        customers = serializer.save()
+        return Response(CustomerCartSerializer(customers, many=True).data, status=status.HTTP_201_CREATED)
+
+class CustomerExportView(ExportView):
+    """
+    View to stream all customers as csv or ndjson.
+    """
+    queryset = Customer.objects.all()
+    fields = ('id', 'name', 'created_at')
+    filename = 'customers'
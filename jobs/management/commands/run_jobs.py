@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.models import Job
+from jobs.services import claim_jobs, requeue_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    """
+    Command to run queued background jobs with a pool of worker threads.
+    Several run_jobs processes can share the queue, each claim takes jobs no other worker holds.
+    """
+    help = 'Claim and run due background jobs, until the queue is empty with --once or forever polling every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Worker threads running jobs at the same time.')
+        parser.add_argument('--batch-size', type=int, help='Jobs claimed per poll, defaults to --concurrency.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when no job is due.')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due instead of polling.')
+        parser.add_argument('--stale-after', type=float, help='Seconds after which running jobs of stopped workers are requeued.')
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        batch_size = options['batch_size'] or concurrency
+        worker = worker_name()
+        outcomes = {Job.DONE: 0, Job.PENDING: 0, Job.FAILED: 0}
+        pool = ThreadPoolExecutor(concurrency) if concurrency > 1 else None
+        try:
+            while True:
+                requeue_stale_jobs(options['stale_after'])
+                jobs = claim_jobs(batch_size, worker)
+                if jobs:
+                    statuses = pool.map(self.run_in_thread, jobs) if pool else map(run_job, jobs)
+                    for job_status in statuses:
+                        outcomes[job_status] += 1
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {sum(outcomes.values())} jobs: {outcomes[Job.DONE]} done, '
+            f'{outcomes[Job.PENDING]} retried later, {outcomes[Job.FAILED]} failed.'
+        ))
+
+    def run_in_thread(self, job):
+        try:
+            return run_job(job)
+        finally:
+            # every thread opens its own connection, do not leave it open after the job.
+            connections.close_all()
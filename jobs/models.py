@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+class Job(models.Model):
+    """
+    Job Model for deferred work run by run_jobs workers
+     - name: registered handler, called with payload as keyword arguments.
+     - run_at: job is not claimed before this time, failed attempts move it forward with backoff.
+     - locked_by, locked_at: claim of the worker running the job.
+    """
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+    # status for job in queue
+    JOB_STATUS = (
+        (PENDING, _('Job Pending')),
+        (RUNNING, _('Job Running')),
+        (DONE, _('Job Done')),
+        (FAILED, _('Job Failed')),
+    )
+    name = models.CharField(max_length=100, verbose_name = _('Name'))
+    payload = models.JSONField(default=dict, blank = True, verbose_name = _('Payload'))
+    status = models.PositiveSmallIntegerField(choices=JOB_STATUS, default = PENDING, verbose_name = _('status'))
+    attempts = models.PositiveIntegerField(default=0, verbose_name = _('Attempts'))
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name = _('Max attempts'))
+    run_at = models.DateTimeField(default=timezone.now, verbose_name = _('Run at'))
+    locked_by = models.CharField(max_length=100, blank = True, verbose_name = _('Locked by'))
+    locked_at = models.DateTimeField(null = True, blank = True, verbose_name = _('Locked at'))
+    last_error = models.TextField(blank = True, verbose_name = _('Last error'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name = _('Created at'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name = _('Updated at'))
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+        indexes = [
+            # workers claim due pending jobs in run_at order.
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            # claimed jobs are read back by claim token.
+            models.Index(fields=['locked_by'], name='job_locked_by_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,125 @@
+import datetime
+import os
+import socket
+import traceback
+import uuid
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+# job name -> handler, filled by @job in tasks modules of installed apps.
+handlers = {}
+
+
+def job(name):
+    """
+    Register decorated function as handler of jobs with name.
+    """
+    def register(handler):
+        handlers[name] = handler
+        return handler
+    return register
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """
+    Insert pending job with name and payload (json serializable keyword arguments of its handler).
+    """
+    if name not in handlers:
+        raise LookupError(f'No handler registered for job "{name}".')
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+    )
+
+
+def enqueue_on_commit(name, payload=None, **options):
+    """
+    Enqueue job once current transaction commits, so it never runs for rolled back work
+    and never waits on locks of the transaction that requested it.
+    """
+    transaction.on_commit(lambda: enqueue(name, payload, **options))
+
+
+def backoff(attempts):
+    """
+    Seconds to wait before next attempt after attempts failures, doubled per failure up to JOBS_BACKOFF_MAX.
+    """
+    base = getattr(settings, 'JOBS_BACKOFF', 5)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOBS_BACKOFF_MAX', 3600))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(limit, worker=None, now=None):
+    """
+    Claim up to limit due pending jobs for worker and return them
+     - databases with SKIP LOCKED (PostgreSQL) lock due rows with select_for_update(skip_locked=True),
+       concurrent workers claim disjoint jobs without waiting for each other.
+     - other databases (SQLite) read due ids and claim them with one conditional update of still pending rows,
+       a job claimed by another worker meanwhile is just not updated.
+    Claimed jobs are marked running under a unique claim token and their attempts incremented.
+    """
+    now = now or timezone.now()
+    token = f'{worker or worker_name()}:{uuid.uuid4().hex[:12]}'
+    using = router.db_for_write(Job)
+    due = Job.objects.using(using).filter(status=Job.PENDING, run_at__lte=now).order_by('run_at', 'id')
+    with transaction.atomic(using=using):
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        job_ids = list(due.values_list('pk', flat=True)[:limit])
+        if not job_ids:
+            return []
+        Job.objects.using(using).filter(pk__in=job_ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1, updated_at=now
+        )
+    return list(Job.objects.using(using).filter(locked_by=token, status=Job.RUNNING).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """
+    Call handler of claimed job with its payload and record the outcome
+     - success marks job done.
+     - failure puts job back to pending after backoff, or marks it failed when attempts are used up
+       or no handler is registered for it.
+    Outcome is written only while job is still claimed by the same token. Return final status.
+    """
+    handler = handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job "{job.name}".')
+        handler(**job.payload)
+    except Exception:
+        now = timezone.now()
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status, job.run_at = Job.PENDING, now + datetime.timedelta(seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+        job.last_error = traceback.format_exc()
+    else:
+        now = timezone.now()
+        job.status, job.last_error = Job.DONE, ''
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING).update(
+        status=job.status, run_at=job.run_at, last_error=job.last_error, locked_by='', locked_at=None, updated_at=now
+    )
+    return job.status
+
+
+def requeue_stale_jobs(stale_after=None, now=None):
+    """
+    Give running jobs claimed more than stale_after seconds ago (their worker stopped) back to the queue,
+    jobs without attempts left are marked failed. Return number of requeued jobs.
+    """
+    now = now or timezone.now()
+    stale_after = stale_after or getattr(settings, 'JOBS_STALE_AFTER', 600)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - datetime.timedelta(seconds=stale_after))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Worker stopped while running job.', locked_by='', locked_at=None, updated_at=now
+    )
+    return stale.update(status=Job.PENDING, locked_by='', locked_at=None, updated_at=now)
@@ -0,0 +1,79 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from jobs import services
+from jobs.models import Job
+from jobs.services import claim_jobs, enqueue, enqueue_on_commit, job, requeue_stale_jobs, run_job
+
+calls = []
+
+
+@job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+class JobQueueTest(TestCase):
+    """
+    Test Cases for background job queue claims, retries and worker command.
+    """
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(LookupError):
+            enqueue('tests.unknown')
+
+    def test_enqueue_on_commit_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            enqueue_on_commit('tests.record', {'value': 1})
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(Job.objects.get().payload, {'value': 1})
+
+    def test_claim_takes_due_jobs_once(self):
+        first = enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2}, run_at=timezone.now() + datetime.timedelta(hours=1))
+        claimed = claim_jobs(10, 'worker-a')
+        self.assertEqual([claimed_job.pk for claimed_job in claimed], [first.pk])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), (Job.RUNNING, 1))
+        self.assertEqual(claim_jobs(10, 'worker-b'), [])
+        self.assertEqual(run_job(claimed[0]), Job.DONE)
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get(pk=first.pk).locked_by, '')
+
+    @override_settings(JOBS_BACKOFF=10)
+    def test_failed_job_is_retried_with_backoff(self):
+        failing = enqueue('tests.fail', max_attempts=2)
+        self.assertEqual(run_job(claim_jobs(1)[0]), Job.PENDING)
+        failing.refresh_from_db()
+        self.assertIn('RuntimeError: boom', failing.last_error)
+        self.assertGreater(failing.run_at, timezone.now() + datetime.timedelta(seconds=9))
+        self.assertEqual(services.backoff(3), 40)
+        # second attempt uses up max_attempts.
+        self.assertEqual(run_job(claim_jobs(1, now=failing.run_at)[0]), Job.FAILED)
+        self.assertEqual(Job.objects.get(pk=failing.pk).status, Job.FAILED)
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = enqueue('tests.record', {'value': 1})
+        claim_jobs(1)
+        self.assertEqual(requeue_stale_jobs(60, now=timezone.now() + datetime.timedelta(seconds=61)), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_by), (Job.PENDING, ''))
+
+    def test_run_jobs_command(self):
+        enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2})
+        enqueue('tests.fail', max_attempts=1)
+        output = StringIO()
+        call_command('run_jobs', '--once', '--concurrency', '1', '--batch-size', '2', stdout=output)
+        self.assertEqual(calls, [1, 2])
+        self.assertIn('Ran 3 jobs: 2 done, 0 retried later, 1 failed.', output.getvalue())
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+
+
+class ProductSnapshot:
+    """
+    Compact read-only copy of product fields used to validate cart writes.
+    """
+    __slots__ = ('id', 'name', 'price', 'stock_quantity', 'version', 'expires_at')
+
+    FIELDS = ('id', 'name', 'price', 'stock_quantity', 'version')
+
+    def __init__(self, id, name, price, stock_quantity, version, expires_at):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.stock_quantity = stock_quantity
+        self.version = version
+        self.expires_at = expires_at
+
+    def as_product(self):
+        """
+        Return Product instance with snapshot fields loaded, other fields are deferred.
+        """
+        from .models import Product
+        return Product.from_db('default', self.FIELDS, [getattr(self, name) for name in self.FIELDS])
+
+
+class ProductSnapshotCache:
+    """
+    Per process LRU cache of product snapshots with time to live.
+     - at most PRODUCT_SNAPSHOT_CACHE_SIZE snapshots, least recently used ones are evicted.
+     - snapshots expire after PRODUCT_SNAPSHOT_CACHE_TTL seconds, which bounds staleness
+       from writes of other processes.
+     - missing products of one lookup are read with one query.
+    Snapshots may be stale, checks that must be authoritative go to the database.
+    """
+    def __init__(self, size=None, ttl=None):
+        self._size = size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return getattr(settings, 'PRODUCT_SNAPSHOT_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'PRODUCT_SNAPSHOT_CACHE_TTL', 30)
+
+    def get(self, product_id):
+        return self.get_many([product_id]).get(product_id)
+
+    def get_many(self, product_ids):
+        """
+        Return dict of product id to snapshot, ids of missing products are left out.
+        """
+        found, missing = self.lookup(product_ids)
+        if missing:
+            found.update(self.store(list(self.rows(missing))))
+        return found
+
+    async def aget(self, product_id):
+        return (await self.aget_many([product_id])).get(product_id)
+
+    async def aget_many(self, product_ids):
+        """
+        Same as get_many for async views.
+        """
+        found, missing = self.lookup(product_ids)
+        if missing:
+            found.update(self.store([row async for row in self.rows(missing)]))
+        return found
+
+    def rows(self, product_ids):
+        from .models import Product
+        return Product.objects.filter(pk__in=product_ids).values_list(*ProductSnapshot.FIELDS)
+
+    def lookup(self, product_ids):
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for product_id in product_ids:
+                snapshot = self._entries.get(product_id)
+                if snapshot is not None and snapshot.expires_at > now:
+                    self._entries.move_to_end(product_id)
+                    found[product_id] = snapshot
+                    self.hits += 1
+                else:
+                    missing.append(product_id)
+                    self.misses += 1
+        return found, missing
+
+    def store(self, rows):
+        expires_at = time.monotonic() + self.ttl
+        stored = {}
+        with self._lock:
+            for row in rows:
+                snapshot = ProductSnapshot(*row, expires_at)
+                self._entries[snapshot.id] = stored[snapshot.id] = snapshot
+                self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return stored
+
+    def invalidate(self, product_ids):
+        """
+        Drop snapshots of products now and again after current transaction commits
+        so readers can not cache rows that are about to change.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        self.discard(product_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.discard(product_ids))
+
+    def discard(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses, evictions, entries = self.hits, self.misses, self.evictions, len(self._entries)
+        total = hits + misses
+        return {
+            'entries': entries,
+            'max_entries': self.size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'evictions': evictions,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+product_snapshots = ProductSnapshotCache()
@@ -0,0 +1,113 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Product
+from .signals import products_bulk_updated
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FIELDS = ('sku', 'name', 'price', 'stock_quantity')
+MAX_PRICE = Decimal('100000000')  # price max_digits=10, decimal_places=2
+MAX_STOCK_QUANTITY = 2147483647  # largest positive integer column value on every supported database
+
+
+def read_rows(lines, fmt):
+    """
+    Yield (line number, row dict) from iterable of text lines in csv (with header) or ndjson format.
+    """
+    if fmt == CSV:
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def validate_row(row):
+    """
+    Validate and convert one product row, return (product, errors).
+    """
+    if row is None:
+        return None, {'non_field_errors': ['Invalid row.']}
+    errors = {}
+    sku = str(row.get('sku') or '').strip()
+    if not sku:
+        errors['sku'] = ['This field is required.']
+    elif len(sku) > 64:
+        errors['sku'] = ['Ensure this field has no more than 64 characters.']
+    name = str(row.get('name') or '').strip()
+    if not name:
+        errors['name'] = ['This field is required.']
+    elif len(name) > 100:
+        errors['name'] = ['Ensure this field has no more than 100 characters.']
+    try:
+        price = Decimal(str(row.get('price'))).quantize(Decimal('0.01'))
+        if not price.is_finite() or price < 0 or price >= MAX_PRICE:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors['price'] = ['A valid price is required.']
+    try:
+        stock_quantity = int(str(row.get('stock_quantity')))
+        if stock_quantity < 0 or stock_quantity > MAX_STOCK_QUANTITY:
+            raise ValueError
+    except ValueError:
+        errors['stock_quantity'] = ['A valid positive integer is required.']
+    if errors:
+        return None, errors
+    return Product(sku=sku, name=name, price=price, stock_quantity=stock_quantity), None
+
+
+def upsert_products(products):
+    """
+    Insert or update products by sku in one statement, bump their versions and notify listeners of changed skus.
+    """
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=['sku'], update_fields=['name', 'price', 'stock_quantity', 'updated_at']
+        )
+        skus = [product.sku for product in products]
+        # upsert can not increment, bump versions so readers of the old rows see the change.
+        Product.objects.filter(sku__in=skus).update(version=F('version') + 1, updated_at=timezone.now())
+        products_bulk_updated.send(sender=Product, skus=skus)
+
+
+def import_products(lines, fmt=CSV, chunk_size=1000, max_errors=1000):
+    """
+    Import products from iterable of text lines validating and upserting them in chunks
+    so memory stays bounded whatever the input size.
+    Return report with rows, imported, failed counts, first max_errors row errors and throughput.
+    """
+    start = time.perf_counter()
+    report = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': []}
+    chunk = {}
+    for number, row in read_rows(lines, fmt):
+        report['rows'] += 1
+        product, errors = validate_row(row)
+        if errors:
+            report['failed'] += 1
+            if len(report['errors']) < max_errors:
+                report['errors'].append({'line': number, 'errors': errors})
+            continue
+        # same sku repeated in one chunk would hit the same row twice in one statement, last one wins.
+        chunk[product.sku] = product
+        if len(chunk) >= chunk_size:
+            upsert_products(list(chunk.values()))
+            report['imported'] += len(chunk)
+            chunk = {}
+    if chunk:
+        upsert_products(list(chunk.values()))
+        report['imported'] += len(chunk)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['rows_per_second'] = round(report['rows'] / report['seconds']) if report['seconds'] else report['rows']
+    return report
@@ -0,0 +1,21 @@
+import json
+from django.core.management.base import BaseCommand
+from product.importer import CSV, NDJSON, import_products
+
+
+class Command(BaseCommand):
+    """
+    Command to bulk import products by sku from csv or ndjson file.
+    """
+    help = 'Upsert products by sku from a csv (with header) or ndjson file in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=[CSV, NDJSON], help='Input format, guessed from file extension when omitted.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated and upserted per statement.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or (NDJSON if options['path'].endswith(('.ndjson', '.jsonl')) else CSV)
+        with open(options['path'], newline='', encoding='utf-8') as lines:
+            report = import_products(lines, fmt, options['chunk_size'])
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:46
+
+from django.db import migrations, models
+from product.search import install_name_indexes, uninstall_name_indexes
+
+
+def install_name_search(apps, schema_editor):
+    install_name_indexes(schema_editor)
+
+
+def uninstall_name_search(apps, schema_editor):
+    uninstall_name_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_product_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        migrations.RunPython(install_name_search, uninstall_name_search),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:51
+
+from django.db import migrations, models
+from product.search import install_name_indexes
+
+
+def reinstall_name_search(apps, schema_editor):
+    # SQLite may rebuild product table to add or drop the column, which drops search triggers and indexes.
+    install_name_indexes(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_product_search_indexes'),
+    ]
+
+    operations = [
+        # reversed last, after the column is dropped.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_name_search),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(reinstall_name_search, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,67 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import product_snapshots
+from .signals import products_bulk_updated
 
 class Product(models.Model):
     """
     Product Model.
     """
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock_quantity = models.PositiveIntegerField()
+    # sum of active cart holds (cart.StockReservation), available stock is stock_quantity - reserved_quantity.
+    reserved_quantity = models.PositiveIntegerField(default=0)
+    # bumped on every write, cart items compare it to detect stock or price read before a change.
+    version = models.PositiveIntegerField(default=0)
+    # bumped by every write (set-based stock and reserved updates included), validates conditional GETs.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # search keyset orderings by name or price, see product.search.ORDERINGS.
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @property
+    def available_quantity(self):
+        return self.stock_quantity - self.reserved_quantity
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding:
+            # bumped in the UPDATE itself, concurrent saves never write the same version.
+            self.version = F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # reserved_quantity is maintained by set-based updates only, never written back from memory.
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'reserved_quantity'
+                ]
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        super().save(*args, **kwargs)
+        if not adding:
+            self.refresh_from_db(fields=['version'])
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_snapshot(sender, instance, **kwargs):
+    """
+    Signal receiver function to drop cached snapshot of saved or deleted product.
+    """
+    product_snapshots.invalidate([instance.pk])
+
+@receiver(products_bulk_updated, sender=Product)
+def invalidate_bulk_product_snapshots(sender, skus, **kwargs):
+    """
+    Signal receiver function to drop cached snapshots after products are written in bulk.
+    """
+    product_snapshots.clear()
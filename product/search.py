@@ -0,0 +1,139 @@
+"""
+Product search by name, price range and available stock.
+Name lookups are case insensitive and backed by database specific indexes installed with
+install_name_indexes (product migration 0005):
+ - SQLite: NOCASE index for prefix LIKE and FTS5 trigram table (kept in sync by triggers)
+   for substring matches, when SQLite is built with FTS5.
+ - PostgreSQL: UPPER(name) pattern index for prefix LIKE and pg_trgm GIN index for substring
+   matches, when pg_trgm extension can be created.
+Without those indexes the same queries are answered by scanning products.
+"""
+import logging
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'prefix'
+CONTAINS = 'contains'
+
+# keyset orderings by query parameter, each one is served by an index ending with id.
+ORDERINGS = {
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+
+NAME_FTS_TABLE = 'product_name_fts'
+# trigram tokenizer only indexes substrings of at least 3 characters.
+NAME_FTS_MIN_LENGTH = 3
+
+SQLITE_NAME_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS product_name_nocase_idx ON product_product (name COLLATE NOCASE)',
+)
+SQLITE_NAME_FTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {NAME_FTS_TABLE} "
+    f"USING fts5(name, content='product_product', content_rowid='id', tokenize='trigram')",
+    f'CREATE TRIGGER IF NOT EXISTS {NAME_FTS_TABLE}_insert AFTER INSERT ON product_product BEGIN '
+    f'INSERT INTO {NAME_FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END',
+    f'CREATE TRIGGER IF NOT EXISTS {NAME_FTS_TABLE}_delete AFTER DELETE ON product_product BEGIN '
+    f"INSERT INTO {NAME_FTS_TABLE}({NAME_FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f'CREATE TRIGGER IF NOT EXISTS {NAME_FTS_TABLE}_update AFTER UPDATE OF name ON product_product BEGIN '
+    f"INSERT INTO {NAME_FTS_TABLE}({NAME_FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f'INSERT INTO {NAME_FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END',
+    f"INSERT INTO {NAME_FTS_TABLE}({NAME_FTS_TABLE}) VALUES ('rebuild')",
+)
+POSTGRESQL_NAME_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS product_name_upper_like_idx ON product_product (UPPER(name::text) text_pattern_ops)',
+)
+POSTGRESQL_NAME_TRIGRAM = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON product_product USING gin (UPPER(name::text) gin_trgm_ops)',
+)
+
+# database name -> whether NAME_FTS_TABLE exists, looked up once per database.
+_name_fts = {}
+
+
+def _execute_optional(schema_editor, statements, feature):
+    """
+    Run statements of optional feature in a savepoint, skip the feature when database does not support it.
+    """
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+    except DatabaseError as exc:
+        logger.warning('Product name %s index is not installed: %s', feature, exc)
+
+
+def install_name_indexes(schema_editor):
+    """
+    Install database specific product name search indexes, safe to run again
+    (SQLite drops triggers and custom indexes when a migration rebuilds product table).
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_NAME_INDEXES:
+            schema_editor.execute(statement)
+        _execute_optional(schema_editor, SQLITE_NAME_FTS, 'full text')
+    elif vendor == 'postgresql':
+        for statement in POSTGRESQL_NAME_INDEXES:
+            schema_editor.execute(statement)
+        _execute_optional(schema_editor, POSTGRESQL_NAME_TRIGRAM, 'trigram')
+    _name_fts.clear()
+
+
+def uninstall_name_indexes(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for action in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {NAME_FTS_TABLE}_{action}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {NAME_FTS_TABLE}')
+        schema_editor.execute('DROP INDEX IF EXISTS product_name_nocase_idx')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS product_name_upper_like_idx')
+    _name_fts.clear()
+
+
+def has_name_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _name_fts:
+        with connection.cursor() as cursor:
+            _name_fts[name] = NAME_FTS_TABLE in connection.introspection.table_names(cursor)
+    return _name_fts[name]
+
+
+def filter_name(queryset, text, match=CONTAINS):
+    """
+    Filter products whose name starts with or contains text, ignoring case.
+    SQLite substring matches go through the FTS5 trigram table when it is installed.
+    """
+    if match == PREFIX:
+        return queryset.filter(name__istartswith=text)
+    if len(text) >= NAME_FTS_MIN_LENGTH and has_name_fts(connections[queryset.db]):
+        # FTS5 only uses the trigram index for LIKE without ESCAPE, wildcards in text widen
+        # the candidates and icontains keeps exact matches.
+        matches = RawSQL(f'SELECT rowid FROM {NAME_FTS_TABLE} WHERE name LIKE %s', (f'%{text}%',))
+        queryset = queryset.filter(pk__in=matches)
+    return queryset.filter(name__icontains=text)
+
+
+def search_products(queryset, q='', match=CONTAINS, min_price=None, max_price=None, in_stock=False, **kwargs):
+    """
+    Filter products by name text, price range and available stock (stock not held by carts).
+    """
+    if q:
+        queryset = filter_name(queryset, q, match)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    if in_stock:
+        queryset = queryset.filter(stock_quantity__gt=F('reserved_quantity'))
+    return queryset
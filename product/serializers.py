@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from api.sparse import SparseFieldsMixin
 from .models import Product
+from .search import CONTAINS, ORDERINGS, PREFIX
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
@@ -10,4 +12,39 @@ class ProductListSerializer(serializers.ModelSerializer):
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['reserved_quantity', 'version']
+
+class ProductImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    errors = serializers.DictField(child=serializers.ListField(child=serializers.CharField()))
+
+class ProductImportReportSerializer(serializers.Serializer):
+    """
+    ProductImportReport Serializer to describe report of product import, only used for schema.
+    """
+    rows = serializers.IntegerField()
+    imported = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    errors = ProductImportErrorSerializer(many=True)
+    seconds = serializers.FloatField()
+    rows_per_second = serializers.IntegerField()
+
+class ProductSearchFilterSerializer(serializers.Serializer):
+    """
+    ProductSearchFilter Serializer to validate product search query parameters.
+     - q matches product name by prefix or substring (match), ignoring case.
+     - min_price must not be greater than max_price.
+    """
+    q = serializers.CharField(max_length=100, required=False, default='')
+    match = serializers.ChoiceField(choices=[CONTAINS, PREFIX], default=CONTAINS)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    in_stock = serializers.BooleanField(default=False)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='name')
+
+    def validate(self, attrs):
+        min_price, max_price = attrs.get('min_price'), attrs.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError("min_price must not be greater than max_price.")
+        return attrs
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Sent after products are written in bulk without post_save, with skus argument.
+products_bulk_updated = Signal()
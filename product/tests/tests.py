@@ -1,8 +1,21 @@
+import base64
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
+from cart.models import Cart
+from customer.models import Customer
+from product.cache import ProductSnapshotCache, product_snapshots
+from product.importer import import_products
 from product.models import Product
+from product.views import ProductListView
 
 class ProductListCreateViewTestCase(TestCase):
     """
@@ -20,7 +33,64 @@ class ProductListCreateViewTestCase(TestCase):
 
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)  # Check the number of Products returned
+        self.assertEqual(len(response.data['results']), 2)  # Check the number of Products returned
+
+    def test_list_products_keyset_pages(self):
+        products = Product.objects.bulk_create(
+            [Product(name=f'Prod {i}', price = 10, stock_quantity=5) for i in range(5)]
+        )
+        url, seen = f'{self.list_url}?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(product['id'] for product in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [product.id for product in products])
+
+    def test_list_products_fast_path_matches_drf(self):
+        Product.objects.bulk_create([Product(name=f'Prod {i}', price = Decimal('10.5'), stock_quantity=5) for i in range(3)])
+        url = f'{self.list_url}?page_size=2'
+        fast = self.client.get(url)
+        with mock.patch.object(ProductListView, 'fast_serialization', False):
+            drf = self.client.get(url)
+        self.assertEqual(fast.content, drf.content)
+        self.assertIsNotNone(fast.data['next'])
+
+    def test_list_products_sparse_fields(self):
+        Product.objects.bulk_create([Product(name=f'Prod {i}', price = 10, stock_quantity=5) for i in range(3)])
+        url = f'{self.list_url}?fields=id,name&page_size=2'
+        fast = self.client.get(url)
+        self.assertEqual(list(fast.data['results'][0]), ['id', 'name'])
+        with mock.patch.object(ProductListView, 'fast_serialization', False):
+            with CaptureQueriesContext(connection) as queries:
+                drf = self.client.get(url)
+        self.assertEqual(fast.content, drf.content)
+        self.assertNotIn('stock_quantity', queries[0]['sql'])
+
+    def test_list_products_invalid_cursor(self):
+        response = self.client.get(f'{self.list_url}?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        for position in (['abc'], [None], [{'a': 1}], [1, 2]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(self.list_url, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_concurrent_saves_bump_version(self):
+        product = Product.objects.create(name='Prod 1', price = 1000, stock_quantity=5)
+        first, second = Product.objects.get(pk=product.pk), Product.objects.get(pk=product.pk)
+        first.save()
+        second.save()
+        self.assertEqual((first.version, second.version), (1, 2))
+        self.assertEqual(Product.objects.get(pk=product.pk).version, 2)
+
+    def test_export_products_csv(self):
+        Product.objects.create(name='Prod 1', price = 1000, stock_quantity=5)
+        response = self.client.get(reverse('product_export'), {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,sku,name,price,stock_quantity')
+        self.assertTrue(lines[1].endswith(',Prod 1,1000.00,5'))
 
     def test_create_customer(self):
         # Create product for testing
@@ -30,3 +100,165 @@ class ProductListCreateViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Product.objects.count(), 1)  # Check if the product was created
         self.assertEqual(Product.objects.first().name, 'Prod 1')
+
+class ProductImportViewTestCase(TestCase):
+    """
+    Test Cases for bulk import products.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.import_url = reverse('product_import')
+
+    def test_import_csv_upserts_by_sku(self):
+        Product.objects.create(sku='SKU-1', name='Old name', price = 1, stock_quantity=1)
+        body = 'sku,name,price,stock_quantity\nSKU-1,Prod 1,10.5,3\nSKU-2,Prod 2,20,4\nSKU-3,,-1,x\n'
+
+        response = self.client.post(self.import_url, data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['rows'], response.data['imported'], response.data['failed']), (3, 2, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 4)
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'name', 'price', 'stock_quantity'})
+        product = Product.objects.get(sku='SKU-1')
+        self.assertEqual((product.name, product.price, product.stock_quantity), ('Prod 1', Decimal('10.50'), 3))
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_import_ndjson_in_chunks(self):
+        body = ''.join(
+            f'{{"sku": "SKU-{i}", "name": "Prod {i}", "price": "{i}.00", "stock_quantity": {i}}}\n' for i in range(25)
+        ) + 'not json\n'
+        report = import_products(body.splitlines(keepends=True), fmt='ndjson', chunk_size=10)
+        self.assertEqual((report['rows'], report['imported'], report['failed']), (26, 25, 1))
+        self.assertEqual(Product.objects.filter(sku__startswith='SKU-').count(), 25)
+
+    def test_import_rejects_out_of_range_stock(self):
+        body = 'sku,name,price,stock_quantity\nSKU-1,Prod 1,1,99999999999999999999999\nSKU-2,Prod 2,1,3000000000\nSKU-3,Prod 3,1,2147483647\n'
+        response = self.client.post(self.import_url, data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['imported'], response.data['failed']), (1, 2))
+        self.assertEqual(response.data['errors'][0]['errors'], {'stock_quantity': ['A valid positive integer is required.']})
+
+    def test_import_invalid_encoding(self):
+        body = 'sku,name,price,stock_quantity\nSKU-1,Caf\xe9,1,1\n'.encode('latin-1')
+        response = self.client.post(self.import_url, data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_schema(self):
+        output = StringIO()
+        # any view schema can not be generated for fails the command.
+        call_command('spectacular', '--fail-on-warn', stdout=output, stderr=StringIO())
+        self.assertIn('ProductImportReport', output.getvalue())
+
+    def test_import_unsupported_content_type(self):
+        response = self.client.post(self.import_url, data={'sku': 'SKU-1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProductSnapshotCacheTestCase(TestCase):
+    """
+    Test Cases for product snapshot cache used to validate cart writes.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.product = Product.objects.create(name='Prod 1', price = 1000, stock_quantity=5)
+        product_snapshots.clear()
+        product_snapshots.reset_stats()
+
+    def test_snapshot_hit_and_stats(self):
+        with self.assertNumQueries(1):
+            product_snapshots.get(self.product.id)
+        with self.assertNumQueries(0):
+            snapshot = product_snapshots.get(self.product.id)
+        self.assertEqual((snapshot.name, snapshot.stock_quantity, snapshot.version), ('Prod 1', 5, self.product.version))
+        self.assertIsNone(product_snapshots.get(self.product.id + 100))
+        response = self.client.get(reverse('product_cache_stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['entries'], response.data['hits'], response.data['misses']), (1, 1, 2))
+
+    def test_snapshot_invalidated_on_save(self):
+        product_snapshots.get(self.product.id)
+        self.product.stock_quantity = 1
+        self.product.save()
+        self.assertEqual(product_snapshots.get(self.product.id).stock_quantity, 1)
+
+    def test_snapshot_evicts_least_recently_used(self):
+        snapshots = ProductSnapshotCache(size=2)
+        products = Product.objects.bulk_create([Product(name=f'Prod {i}', price = 10, stock_quantity=5) for i in range(2)])
+        snapshots.get_many([self.product.id, products[0].id])
+        snapshots.get(self.product.id)
+        snapshots.get(products[1].id)
+        self.assertEqual(snapshots.stats()['evictions'], 1)
+        with self.assertNumQueries(0):
+            snapshots.get(self.product.id)
+
+    def test_add_item_reads_product_from_snapshot(self):
+        cart = Customer.objects.create(name='Hassan').cart
+        data = {'cart': cart.id, 'product': self.product.id, 'quantity': 1}
+        self.client.post(reverse('cart-add-item'), data)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('cart-add-item'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse([query for query in queries if 'FROM "product_product"' in query['sql'] and 'SELECT' in query['sql'][:6]])
+
+    def test_add_item_rechecks_stale_stock(self):
+        product_snapshots.get(self.product.id)
+        Product.objects.filter(pk=self.product.id).update(stock_quantity=8)
+        cart = Customer.objects.create(name='Hassan').cart
+        response = self.client.post(reverse('cart-add-item'), {'cart': cart.id, 'product': self.product.id, 'quantity': 7})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_add_item_totals_use_current_price(self):
+        product_snapshots.get(self.product.id)
+        # written by another process, its post_save can not clear this process snapshot.
+        Product.objects.filter(pk=self.product.id).update(price=2000)
+        cart = Customer.objects.create(name='Hassan').cart
+        response = self.client.post(reverse('cart-add-item'), {'cart': cart.id, 'product': self.product.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cart.refresh_from_db()
+        self.assertEqual(cart.total_price, 4000)
+        self.assertFalse(Cart.objects.drifted().exists())
+
+class ProductSearchViewTestCase(TestCase):
+    """
+    Test Cases for product search.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.search_url = reverse('product_search')
+        self.keyboard = Product.objects.create(name='Red Keyboard', price = 50, stock_quantity=5)
+        self.mouse = Product.objects.create(name='red mouse', price = 20, stock_quantity=5, reserved_quantity=5)
+        self.monitor = Product.objects.create(name='Blue Monitor', price = 200, stock_quantity=0)
+
+    def search(self, **params):
+        response = self.client.get(self.search_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product['id'] for product in response.data['results']]
+
+    def test_search_name_ignores_case(self):
+        self.assertEqual(self.search(q='RED', match='prefix'), [self.keyboard.id, self.mouse.id])
+        self.assertEqual(self.search(q='mOuS'), [self.mouse.id])
+        self.assertEqual(self.search(q='D m'), [self.mouse.id])
+        self.assertEqual(self.search(q='100%'), [])
+
+    def test_search_follows_renamed_products(self):
+        self.mouse.name = 'Gaming Mouse'
+        self.mouse.save()
+        self.assertEqual(self.search(q='gaming'), [self.mouse.id])
+        self.assertEqual(self.search(q='red mouse'), [])
+
+    def test_search_price_range_and_stock(self):
+        self.assertEqual(self.search(min_price='20', max_price='50', ordering='price'), [self.mouse.id, self.keyboard.id])
+        self.assertEqual(self.search(in_stock='true'), [self.keyboard.id])
+
+    def test_search_keyset_pages_in_ordering(self):
+        url, seen = f'{self.search_url}?ordering=-price&page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(product['id'] for product in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [self.monitor.id, self.keyboard.id, self.mouse.id])
+
+    def test_search_invalid_filters(self):
+        response = self.client.get(self.search_url, {'min_price': '50', 'max_price': '20'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.search_url, {'ordering': 'stock_quantity'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
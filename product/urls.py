@@ -1,6 +1,10 @@
 from django.urls import path
-from .views import ProductListView, ProductCreateView
+from .views import ProductListView, ProductSearchView, ProductCreateView, ProductExportView, ProductImportView, ProductCacheStatsView
 urlpatterns = [
     path('list/',ProductListView.as_view(), name='product_list'),
+    path('search/',ProductSearchView.as_view(), name='product_search'),
     path('create/',ProductCreateView.as_view(), name='product_create'),
+    path('export/',ProductExportView.as_view(), name='product_export'),
+    path('import/',ProductImportView.as_view(), name='product_import'),
+    path('cache_stats/',ProductCacheStatsView.as_view(), name='product_cache_stats'),
 ]
\ No newline at end of file
@@ -1,18 +1,94 @@
-from rest_framework import generics
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.conditional import ConditionalListMixin
+from api.fastpath import FastListMixin
+from api.routers import ReplicaReadsMixin
+from api.streaming import ExportView
+from .cache import product_snapshots
+from .importer import CSV, NDJSON, import_products
 from .models import Product
-from .serializers import ProductListSerializer, ProductCreateSerializer
+from .search import ORDERINGS, search_products
+from .serializers import (
+    ProductListSerializer, ProductCreateSerializer, ProductImportReportSerializer, ProductSearchFilterSerializer
+)
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(ReplicaReadsMixin, ConditionalListMixin, FastListMixin, generics.ListAPIView):
     """
-    View to list all serilized products in form of ProductListSerializer.
+    View to list all serilized products in form of ProductListSerializer, read from replica when configured,
+    pages carry ETag for conditional GET.
     """
     queryset = Product.objects.all()
     serializer_class = ProductListSerializer
 
+class ProductSearchView(ReplicaReadsMixin, ConditionalListMixin, FastListMixin, generics.ListAPIView):
+    """
+    View to search products by name, price range and available stock in form of ProductListSerializer,
+    pages are keyset paginated in requested ordering.
+    """
+    queryset = Product.objects.all()
+    serializer_class = ProductListSerializer
+
+    @property
+    def keyset_ordering(self):
+        return ORDERINGS[self.filters['ordering']]
+
+    def filter_queryset(self, queryset):
+        filters = ProductSearchFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        self.filters = filters.validated_data
+        return search_products(queryset, **self.filters)
+
+    @extend_schema(parameters=[ProductSearchFilterSerializer])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 class ProductCreateView(generics.CreateAPIView):
     """
     View to create Product in form of ProductCreateSerializer.
     """
     queryset = Product.objects.all()
-    serializer_class = ProductCreateSerializer
\ No newline at end of file
+    serializer_class = ProductCreateSerializer
+
+class ProductExportView(ExportView):
+    """
+    View to stream all products as csv or ndjson.
+    """
+    queryset = Product.objects.all()
+    fields = ('id', 'sku', 'name', 'price', 'stock_quantity')
+    filename = 'products'
+
+class ProductImportView(APIView):
+    """
+    View to bulk import products by sku from streamed request body sent as text/csv (with header)
+    or application/x-ndjson, existing skus get name, price and stock updated.
+    """
+    content_types = {'text/csv': CSV, 'application/x-ndjson': NDJSON}
+
+    @extend_schema(
+        request={content_type: OpenApiTypes.BINARY for content_type in content_types},
+        responses={200: ProductImportReportSerializer},
+    )
+    def post(self, request):
+        fmt = self.content_types.get(request.content_type.split(';')[0].strip())
+        if fmt is None:
+            return Response({"error": "Unsupported format, send text/csv or application/x-ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+        stream = request.stream
+        lines = (line.decode('utf-8') for line in stream) if stream is not None else iter(())
+        try:
+            report = import_products(lines, fmt)
+        except UnicodeDecodeError:
+            # chunks before the undecodable line are already imported.
+            return Response({"error": "Request body must be utf-8 encoded."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+class ProductCacheStatsView(APIView):
+    """
+    View to show size and hit rate of product snapshot cache in this process.
+    """
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response(product_snapshots.stats())